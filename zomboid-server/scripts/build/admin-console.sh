@@ -36,7 +36,7 @@ echo "Port: ${RCON_PORT}"
 echo "Password: [HIDDEN]"
 echo ""
 echo "Type :q or press Ctrl+C to exit the console"
-echo "WARNING: If connection refused, please wait for the server to fully start."
+echo "WARNING: If connection refused, please wait for the server to fully start (container status: healthy)."
 echo "=========================================="
 
 # Connect to RCON with proper error handling
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import logging
+
+DEFAULT_FAILURE_THRESHOLD = 3
+
+
+class BootBudget:
+    """Shared time budget and circuit breaker for the network-dependent boot steps.
+
+    The Steam Web API requests, the steamcmd warm-up login and the Workshop
+    downloads all draw from a single boot deadline. Each step asks the budget
+    whether it may run and how long it may take. After a number of consecutive
+    failures the circuit breaker opens and the remaining network steps are
+    skipped, so the server starts with the content and cached resolutions it
+    already has. Every skipped step is recorded and reported at the end.
+
+    Attributes:
+        - logger: Logger used to report skipped steps and breaker state.
+        - deadline_seconds: Boot deadline in seconds (0 disables it).
+        - failure_threshold: Consecutive failures that open the breaker (0 disables it).
+        - skipped: Description of each step that was skipped.
+
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        deadline_seconds: float = 0,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+    ) -> None:
+        """Initialize the budget, starting the deadline clock.
+
+        Args:
+            logger: Logger used to report skipped steps and breaker state.
+            deadline_seconds: Boot deadline in seconds (0 disables it).
+            failure_threshold: Consecutive failures that open the breaker (0 disables it).
+
+        """
+        self.logger = logger
+        self.deadline_seconds = deadline_seconds
+        self.failure_threshold = failure_threshold
+        self.skipped: list[str] = []
+        self.consecutive_failures = 0
+        self.breaker_open = False
+        self.started_at = time.monotonic()
+
+    @classmethod
+    def from_env(cls, env: dict, logger: logging.Logger) -> BootBudget:
+        """Create a budget from `BOOT_DEADLINE_SECONDS` and `NETWORK_FAILURE_THRESHOLD`.
+
+        Invalid values are reported and replaced by their defaults.
+        """
+        settings = {"BOOT_DEADLINE_SECONDS": 0, "NETWORK_FAILURE_THRESHOLD": DEFAULT_FAILURE_THRESHOLD}
+        for name, default in settings.items():
+            raw = (env.get(name) or "").strip()
+            if not raw:
+                continue
+            if raw.isdigit():
+                settings[name] = int(raw)
+            else:
+                logger.warning("Invalid %s=%r, using %d", name, raw, default)
+
+        return cls(logger, settings["BOOT_DEADLINE_SECONDS"], settings["NETWORK_FAILURE_THRESHOLD"])
+
+    def remaining(self) -> float | None:
+        """Return the seconds left before the deadline, or None when there is no deadline."""
+        if not self.deadline_seconds:
+            return None
+        return max(0.0, self.deadline_seconds - (time.monotonic() - self.started_at))
+
+    def timeout(self, cap: float | None = None) -> float | None:
+        """Return the timeout a step may use: the remaining budget, bounded by `cap`."""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return remaining if cap is None else min(cap, remaining)
+
+    def allows(self, step: str) -> bool:
+        """Check whether a network step may run, recording it as skipped otherwise.
+
+        Args:
+            step: Human readable description of the step (used in the logs).
+
+        Returns:
+            True if the step may run, False if it must be skipped.
+
+        """
+        if self.breaker_open:
+            reason = f"circuit breaker open after {self.consecutive_failures} consecutive failure(s)"
+        elif self.remaining() == 0:
+            reason = f"boot deadline of {self.deadline_seconds}s exceeded"
+        else:
+            return True
+
+        self.logger.warning("Skipping %s: %s", step, reason)
+        self.skipped.append(step)
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful network step, resetting the failure streak."""
+        self.consecutive_failures = 0
+
+    def record_failure(self, step: str) -> None:
+        """Record a failed network step, opening the breaker once the threshold is reached."""
+        self.consecutive_failures += 1
+        if self.failure_threshold and self.consecutive_failures >= self.failure_threshold and not self.breaker_open:
+            self.breaker_open = True
+            self.logger.error(
+                "%s failed, %d consecutive network failure(s): skipping the remaining network steps",
+                step,
+                self.consecutive_failures,
+            )
+
+    def report(self) -> None:
+        """Log the network steps that were skipped, if any."""
+        if not self.skipped:
+            return
+
+        self.logger.warning("%d network step(s) skipped during boot:", len(self.skipped))
+        for step in self.skipped:
+            self.logger.warning("  - %s", step)
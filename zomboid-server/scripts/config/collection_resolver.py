@@ -1,18 +1,27 @@
 from __future__ import annotations
 
+import codecs
 import json
 import re
 import urllib.parse
 import urllib.request
-from typing import TYPE_CHECKING
+from typing import IO, TYPE_CHECKING
+
+from boot_budget import BootBudget
 
 if TYPE_CHECKING:
     import logging
+    from collections.abc import Iterator
 
 STEAM_API_BASE_URL = "https://api.steampowered.com/ISteamRemoteStorage"
 REQUEST_TIMEOUT_SECONDS = 30
 STEAM_RESULT_OK = 1
 
+# `filetype` of a collection child that is itself a collection (0 for regular items)
+FILETYPE_COLLECTION = 2
+# Upper bound of nested collection levels, as a guard against pathological packs
+MAX_COLLECTION_DEPTH = 10
+
 # Project Zomboid mod authors advertise the mod ID in the Workshop item
 # description following the "Mod ID: <id>" convention.
 MOD_ID_RE = re.compile(r"^\s*Mod\s?ID(?P<plural>s?)\s*:\s*(?P<mod_id>[\w.&-]+)(?P<extra>.*?)\s*$", re.MULTILINE)
@@ -21,29 +30,141 @@ MOD_ID_RE = re.compile(r"^\s*Mod\s?ID(?P<plural>s?)\s*:\s*(?P<mod_id>[\w.&-]+)(?
 # "Mod ID:" convention from the regex above.
 BBCODE_TAG_RE = re.compile(r"\[/?[^\[\]]*\]")
 
+# Bytes read at a time from streamed API responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _read_text(stream: IO[bytes]) -> Iterator[str]:
+    """Read a UTF-8 byte stream as text chunks, never splitting a character."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while chunk := stream.read(STREAM_CHUNK_SIZE):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    decoder.decode(b"", final=True)
+
+
+def _seek_json_array(chunks: Iterator[str], key: str) -> str:
+    """Consume text chunks up to the opening bracket of the array named `key`, returning the rest."""
+    marker = f'"{key}"'
+    buffer = ""
+    while True:
+        start = buffer.find(marker)
+        bracket = buffer.find("[", start + len(marker)) if start >= 0 else -1
+        if bracket >= 0:
+            return buffer[bracket + 1 :]
+        if start < 0:
+            buffer = buffer[-len(marker) :]
+        chunk = next(chunks, None)
+        if chunk is None:
+            msg = f"no '{key}' array in the response"
+            raise ValueError(msg)
+        buffer += chunk
+
+
+def iter_json_array(stream: IO[bytes], key: str) -> Iterator[dict]:
+    """Decode the elements of the first JSON array named `key` one at a time.
+
+    Only the element being decoded (and one chunk of input) is held in
+    memory, so the size of the whole payload does not matter.
+
+    Args:
+        stream: Binary stream of a UTF-8 JSON document.
+        key: Name of the array to decode.
+
+    Yields:
+        Each element of the array.
+
+    Raises:
+        ValueError: If the array is missing, malformed or truncated.
+
+    """
+    decoder = json.JSONDecoder()
+    chunks = _read_text(stream)
+    buffer = _seek_json_array(chunks, key)
+
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        if buffer:
+            try:
+                element, end = decoder.raw_decode(buffer)
+            except ValueError:
+                pass  # Incomplete element, read more
+            else:
+                yield element
+                buffer = buffer[end:]
+                continue
+        chunk = next(chunks, None)
+        if chunk is None:
+            msg = f"truncated '{key}' array in the response"
+            raise ValueError(msg)
+        buffer += chunk
+
+
+class WorkshopItemRecord:
+    """Compact record of the `GetPublishedFileDetails` fields the resolver uses.
+
+    The description is parsed for mod IDs when the record is built and then
+    dropped, along with the tags, previews and URLs of the API entry.
+    """
+
+    __slots__ = (
+        "ambiguous",
+        "ban_reason",
+        "banned",
+        "file_size",
+        "item_id",
+        "mod_ids",
+        "result",
+        "time_updated",
+        "title",
+    )
+
+    def __init__(self, details: dict) -> None:
+        """Build the record from one `publishedfiledetails` entry."""
+        self.item_id: str = str(details.get("publishedfileid", "?"))
+        self.title: str = details.get("title", "unknown")
+        self.result: int = details.get("result", 0)
+        self.banned: bool = bool(details.get("banned"))
+        self.ban_reason: str = details.get("ban_reason") or ""
+        self.time_updated: int = int(details.get("time_updated") or 0)
+        self.file_size: int = int(details.get("file_size") or 0)
+
+        description = BBCODE_TAG_RE.sub("", details.get("description", "")).replace("\r", "")
+        matches = list(MOD_ID_RE.finditer(description))
+        self.mod_ids: tuple[str, ...] = tuple(sorted({match["mod_id"] for match in matches}))
+        self.ambiguous: bool = any(match["plural"] or match["extra"] for match in matches)
+
 
 class SteamCollectionResolver:
     """Resolve Steam Workshop collections into Workshop item IDs and mod IDs.
 
     Uses two public Steam Web API endpoints (no API key required):
         - GetCollectionDetails: expands collection IDs into the Workshop
-          items they contain.
+          items they contain, following nested collections level by level.
         - GetPublishedFileDetails: fetches the details of each Workshop item,
           from which the mod IDs are derived by parsing the "Mod ID: <id>"
           convention that Project Zomboid authors follow in the description.
 
     Network or parsing failures are logged and produce empty results, so the
-    server startup continues with the manually configured selection.
+    server startup continues with the manually configured selection. Requests
+    draw their timeout from the boot budget and are skipped once it runs out
+    or its circuit breaker opens; `failed_requests` counts both cases.
     """
 
-    def __init__(self, logger: logging.Logger) -> None:
+    def __init__(self, logger: logging.Logger, budget: BootBudget | None = None) -> None:
         """Initialize the resolver.
 
         Args:
             logger: Logger used to report resolution progress and failures.
+            budget: Boot budget shared with the other network steps.
 
         """
         self.logger = logger
+        self.budget = budget or BootBudget(logger)
+        self.failed_requests = 0
 
     def get_collection_items(self, collection_ids: set[str]) -> set[str]:
         """Expand Workshop collections into the Workshop item IDs they contain.
@@ -55,30 +176,111 @@ class SteamCollectionResolver:
             A set of Workshop item IDs (strings). Empty if nothing could be resolved.
 
         """
-        valid_ids = self._keep_numeric_ids(collection_ids)
-        if not valid_ids:
-            return set()
+        return set().union(*self.get_collection_tree(collection_ids).values())
 
-        response = self._query_api("GetCollectionDetails", "collectioncount", valid_ids)
-        items: set[str] = set()
+    def get_collection_tree(self, collection_ids: set[str]) -> dict[str, set[str]]:
+        """Expand each Workshop collection into the Workshop item IDs it contains.
 
-        for collection in (response or {}).get("collectiondetails", []):
-            collection_id = collection.get("publishedfileid", "?")
-            if collection.get("result") != STEAM_RESULT_OK:
-                self.logger.error("Could not resolve collection %s, check that it exists and is public", collection_id)
-                continue
+        Collections may contain other collections (common in community
+        modpacks). They are expanded breadth-first: each depth level is
+        resolved with a single batched `GetCollectionDetails` call, children
+        are told apart by their `filetype`, and a visited set prevents a
+        collection from being expanded twice (or looping forever).
 
-            children = {
-                child["publishedfileid"] for child in collection.get("children", []) if "publishedfileid" in child
-            }
-            self.logger.info("Collection %s contains %d workshop item(s)", collection_id, len(children))
-            items |= children
+        Args:
+            collection_ids: Set of Workshop collection IDs (numeric strings).
 
+        Returns:
+            A mapping of each valid requested collection ID to the items it
+            contains, including those of its nested collections.
+
+        """
+        roots = self._keep_numeric_ids(collection_ids)
+        pending = set(roots)
+        visited: set[str] = set()
+        direct_items: dict[str, set[str]] = {}
+        sub_collections: dict[str, set[str]] = {}
+
+        for depth in range(MAX_COLLECTION_DEPTH):
+            if not pending:
+                break
+
+            visited |= pending
+            response = self._query_api("GetCollectionDetails", "collectioncount", pending)
+
+            for collection in (response or {}).get("collectiondetails", []):
+                collection_id = collection.get("publishedfileid", "?")
+                if collection.get("result") != STEAM_RESULT_OK:
+                    self.logger.error(
+                        "Could not resolve collection %s, check that it exists and is public",
+                        collection_id,
+                    )
+                    continue
+
+                children = [child for child in collection.get("children", []) if "publishedfileid" in child]
+                child_items = {
+                    child["publishedfileid"] for child in children if child.get("filetype") != FILETYPE_COLLECTION
+                }
+                child_collections = {
+                    child["publishedfileid"] for child in children if child.get("filetype") == FILETYPE_COLLECTION
+                }
+
+                if child_collections:
+                    self.logger.info(
+                        "Collection %s contains %d workshop item(s) and %d sub-collection(s)",
+                        collection_id,
+                        len(child_items),
+                        len(child_collections),
+                    )
+                else:
+                    self.logger.info("Collection %s contains %d workshop item(s)", collection_id, len(child_items))
+
+                direct_items[collection_id] = child_items
+                sub_collections[collection_id] = child_collections
+
+            pending = set().union(*sub_collections.values()) - visited
+            if pending and depth == MAX_COLLECTION_DEPTH - 1:
+                self.logger.warning(
+                    "Collections nested deeper than %d levels are ignored: %s",
+                    MAX_COLLECTION_DEPTH,
+                    ", ".join(sorted(pending)),
+                )
+
+        return {root: self._gather_items(root, direct_items, sub_collections) for root in roots}
+
+    @staticmethod
+    def _gather_items(
+        root: str,
+        direct_items: dict[str, set[str]],
+        sub_collections: dict[str, set[str]],
+    ) -> set[str]:
+        """Collect the items of a collection and of every collection nested in it."""
+        items: set[str] = set()
+        seen = {root}
+        stack = [root]
+        while stack:
+            collection_id = stack.pop()
+            items |= direct_items.get(collection_id, set())
+            for child in sub_collections.get(collection_id, set()) - seen:
+                seen.add(child)
+                stack.append(child)
         return items
 
     def get_item_mod_ids(self, workshop_ids: set[str]) -> set[str]:
         """Derive the mod IDs of Workshop items from their descriptions.
 
+        Args:
+            workshop_ids: Set of Workshop item IDs (numeric strings).
+
+        Returns:
+            A set of mod IDs (strings). Empty if nothing could be resolved.
+
+        """
+        return set(self.get_item_mod_map(workshop_ids).values())
+
+    def get_item_mod_map(self, workshop_ids: set[str]) -> dict[str, str]:
+        """Derive the mod ID of each Workshop item from its description.
+
         Items that are banned or whose description does not declare exactly
         one mod ID are skipped with a log entry, so they can be added manually
         through the `MODS` environment variable instead.
@@ -87,29 +289,74 @@ class SteamCollectionResolver:
             workshop_ids: Set of Workshop item IDs (numeric strings).
 
         Returns:
-            A set of mod IDs (strings). Empty if nothing could be resolved.
+            A mapping of Workshop item ID to mod ID. Empty if nothing could be resolved.
 
         """
-        valid_ids = self._keep_numeric_ids(workshop_ids)
-        if not valid_ids:
-            return set()
-
-        response = self._query_api("GetPublishedFileDetails", "itemcount", valid_ids)
-        mod_ids: set[str] = set()
-
-        for details in (response or {}).get("publishedfiledetails", []):
-            mod_id = self._extract_mod_id(details)
+        mod_ids: dict[str, str] = {}
+        for record in self.get_item_records(workshop_ids):
+            mod_id = self._extract_mod_id(record)
             if mod_id:
-                mod_ids.add(mod_id)
+                mod_ids[record.item_id] = mod_id
 
         return mod_ids
 
+    def get_item_update_times(self, workshop_ids: set[str]) -> dict[str, int]:
+        """Fetch the time each Workshop item was last updated on Steam.
+
+        Args:
+            workshop_ids: Set of Workshop item IDs (numeric strings).
+
+        Returns:
+            A mapping of Workshop item ID to its `time_updated` Unix timestamp.
+            Items that could not be fetched are left out.
+
+        """
+        return {
+            record.item_id: record.time_updated
+            for record in self.get_item_records(workshop_ids)
+            if record.result == STEAM_RESULT_OK
+        }
+
+    def get_item_records(self, workshop_ids: set[str]) -> list[WorkshopItemRecord]:
+        """Fetch the details of Workshop items as compact records.
+
+        The `GetPublishedFileDetails` response is decoded one item at a time,
+        keeping only the fields of `WorkshopItemRecord`, so peak memory does
+        not grow with the size of the descriptions.
+
+        Args:
+            workshop_ids: Set of Workshop item IDs (numeric strings).
+
+        Returns:
+            A record per item returned by Steam. Empty if nothing could be fetched.
+
+        """
+        valid_ids = self._keep_numeric_ids(workshop_ids)
+        if not valid_ids:
+            return []
+
+        return self._query_item_records(valid_ids) or []
+
     def _keep_numeric_ids(self, ids: set[str]) -> set[str]:
         """Filter out IDs that are not numeric, logging the discarded ones."""
         for invalid in sorted(item for item in ids if not item.isdigit()):
             self.logger.error("Ignoring invalid Workshop ID: %r", invalid)
         return {item for item in ids if item.isdigit()}
 
+    def _build_request(self, method: str, count_key: str, file_ids: set[str]) -> urllib.request.Request:
+        """Build the POST request sending a set of published file IDs to a Steam Web API method."""
+        form = {f"publishedfileids[{i}]": file_id for i, file_id in enumerate(sorted(file_ids))}
+        form[count_key] = str(len(file_ids))
+        return urllib.request.Request(  # noqa: S310 - fixed https:// base URL
+            f"{STEAM_API_BASE_URL}/{method}/v1/",
+            data=urllib.parse.urlencode(form).encode(),
+        )
+
+    def _record_failure(self, step: str) -> None:
+        """Count a failed Steam API request and report it to the boot budget."""
+        self.failed_requests += 1
+        self.budget.record_failure(step)
+
     def _query_api(self, method: str, count_key: str, file_ids: set[str]) -> dict | None:
         """POST a set of published file IDs to a Steam Web API method.
 
@@ -122,54 +369,86 @@ class SteamCollectionResolver:
             The `response` object of the JSON payload, or None on failure.
 
         """
-        form = {f"publishedfileids[{i}]": file_id for i, file_id in enumerate(sorted(file_ids))}
-        form[count_key] = str(len(file_ids))
-        request = urllib.request.Request(  # noqa: S310 - fixed https:// base URL
-            f"{STEAM_API_BASE_URL}/{method}/v1/",
-            data=urllib.parse.urlencode(form).encode(),
-        )
+        step = f"Steam API request {method}"
+        if not self.budget.allows(step):
+            self.failed_requests += 1
+            return None
 
+        request = self._build_request(method, count_key, file_ids)
         try:
-            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_SECONDS) as raw:  # noqa: S310
+            timeout = self.budget.timeout(REQUEST_TIMEOUT_SECONDS)
+            with urllib.request.urlopen(request, timeout=timeout) as raw:  # noqa: S310
                 payload = json.load(raw)
         except (OSError, ValueError) as exc:
             self.logger.error("Steam API request %s failed: %s", method, exc)
+            self._record_failure(step)
             return None
 
         response = payload.get("response") if isinstance(payload, dict) else None
         if not isinstance(response, dict):
             self.logger.error("Malformed Steam API response from %s: %r", method, payload)
+            self._record_failure(step)
             return None
 
+        self.budget.record_success()
         return response
 
-    def _extract_mod_id(self, details: dict) -> str | None:
+    def _query_item_records(self, file_ids: set[str]) -> list[WorkshopItemRecord] | None:
+        """POST Workshop item IDs to `GetPublishedFileDetails`, decoding the response as a stream.
+
+        The items are read one at a time from the response stream, instead of
+        loading the whole JSON payload.
+
+        Args:
+            file_ids: Published file IDs to send.
+
+        Returns:
+            A record per item returned by Steam, or None on failure.
+
+        """
+        method = "GetPublishedFileDetails"
+        step = f"Steam API request {method}"
+        if not self.budget.allows(step):
+            self.failed_requests += 1
+            return None
+
+        request = self._build_request(method, "itemcount", file_ids)
+        try:
+            timeout = self.budget.timeout(REQUEST_TIMEOUT_SECONDS)
+            with urllib.request.urlopen(request, timeout=timeout) as raw:  # noqa: S310
+                records = [WorkshopItemRecord(details) for details in iter_json_array(raw, "publishedfiledetails")]
+        except (OSError, ValueError) as exc:
+            self.logger.error("Steam API request %s failed: %s", method, exc)
+            self._record_failure(step)
+            return None
+
+        self.budget.record_success()
+        return records
+
+    def _extract_mod_id(self, record: WorkshopItemRecord) -> str | None:
         """Extract the mod ID advertised in a Workshop item description.
 
         Args:
-            details: One `publishedfiledetails` entry from the Steam API.
+            record: Record of one `publishedfiledetails` entry from the Steam API.
 
         Returns:
             The mod ID, or None when the item is banned, unavailable, or does
             not declare exactly one unambiguous mod ID.
 
         """
-        item_id = details.get("publishedfileid", "?")
-        title = details.get("title", "unknown")
+        item_id = record.item_id
+        title = record.title
 
-        if details.get("result") != STEAM_RESULT_OK:
+        if record.result != STEAM_RESULT_OK:
             self.logger.error("Could not fetch details of workshop item %s", item_id)
             return None
 
-        if details.get("banned"):
-            reason = details.get("ban_reason") or "no reason given"
+        if record.banned:
+            reason = record.ban_reason or "no reason given"
             self.logger.warning("Workshop item %s ('%s') is banned (%s), skipping", item_id, title, reason)
             return None
 
-        description = BBCODE_TAG_RE.sub("", details.get("description", "")).replace("\r", "")
-        matches = list(MOD_ID_RE.finditer(description))
-
-        if not matches:
+        if not record.mod_ids:
             self.logger.error(
                 "No 'Mod ID:' line found for workshop item %s ('%s'), add its mod ID to the MODS variable manually",
                 item_id,
@@ -177,19 +456,16 @@ class SteamCollectionResolver:
             )
             return None
 
-        has_ambiguous_lines = any(match["plural"] or match["extra"] for match in matches)
-        distinct_ids = {match["mod_id"] for match in matches}
-
-        if has_ambiguous_lines or len(distinct_ids) > 1:
+        if record.ambiguous or len(record.mod_ids) > 1:
             self.logger.error(
                 "Workshop item %s ('%s') declares multiple or ambiguous mod IDs (%s), "
                 "add the right ones to the MODS variable manually",
                 item_id,
                 title,
-                ", ".join(sorted(distinct_ids)),
+                ", ".join(record.mod_ids),
             )
             return None
 
-        mod_id = next(iter(distinct_ids))
+        mod_id = record.mod_ids[0]
         self.logger.info("Workshop item %s ('%s') provides mod ID '%s'", item_id, title, mod_id)
         return mod_id
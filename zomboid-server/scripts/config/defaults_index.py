@@ -0,0 +1,417 @@
+#!/bin/python3
+"""Precompiled index of the server configuration defaults and presets.
+
+The index is built once at image build time and stored next to the defaults
+as `defaults_index.json`. It holds the default INI and SandboxVars files
+already rendered, every key they declare (line number, type, default value and
+allowed range parsed from the `Minimum=... Maximum=...` comments shipped with
+the game) and every Sandbox preset found in `PRESETS_DIR`, also rendered.
+
+The index records the modification time, size and content hash of every file
+it was built from, and is rebuilt at load time when one of them changed, was
+added or was removed. Only files whose modification time or size changed are
+hashed again, so an up-to-date index is loaded without reading the defaults.
+
+At startup the server manager creates the config files straight from the index
+and uses the key catalog to reject invalid overrides, and to report the
+environment variables that look like misspelled keys, before any file is written.
+"""
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+from utils import REGEX, convert_to_flatcase, is_line_valid, setup_logger
+
+INDEX_FILE_NAME = "defaults_index.json"
+INDEX_VERSION = 3
+
+# "Minimum=0 Maximum=1000 Default=2", used by both the INI and the SandboxVars comments
+RANGE_RE = re.compile(r"Minimum=(?P<min>-?\d+(?:\.\d+)?)\s+Maximum=(?P<max>-?\d+(?:\.\d+)?)")
+INT_RE = re.compile(r"^-?\d+$")
+FLOAT_RE = re.compile(r"^-?\d+\.\d+$")
+
+# Environment names shorter than this are too generic to be reported as typos
+_MIN_TYPO_LENGTH = 5
+_TYPO_CUTOFF = 0.85
+
+
+def _list_sources(defaults_dir: str, presets_dir: str | None = None) -> dict[str, Path]:
+    """Return the files the index is built from, keyed by `defaults/<name>` or `presets/<name>`."""
+    files = {f"defaults/{name}": Path(defaults_dir) / name for name in ("default.ini", "default_SandboxVars.lua")}
+    if presets_dir and Path(presets_dir).is_dir():
+        files.update({f"presets/{preset.name}": preset for preset in Path(presets_dir).glob("*.lua")})
+    return dict(sorted(files.items()))
+
+
+def _hash_file(path: Path) -> str:
+    """Hash the content of a file."""
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+
+def describe_sources(defaults_dir: str, presets_dir: str | None = None) -> dict[str, dict]:
+    """Record the modification time, size and content hash of the files the index is built from.
+
+    Args:
+        defaults_dir: Folder holding `default.ini` and `default_SandboxVars.lua`.
+        presets_dir: Folder holding the Sandbox presets (`<name>.lua`).
+
+    Returns:
+        A mapping of each file (`defaults/<name>` or `presets/<name>`) to its
+        `mtime_ns`, `size` and `hash`.
+
+    Raises:
+        OSError: If a file cannot be read.
+
+    """
+    sources = {}
+    for key, path in _list_sources(defaults_dir, presets_dir).items():
+        stat = path.stat()
+        sources[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": _hash_file(path)}
+    return sources
+
+
+def sources_changed(sources: dict, defaults_dir: str, presets_dir: str | None = None) -> bool:
+    """Check whether the files the index is built from differ from the recorded ones.
+
+    A file is only read and hashed when its modification time or size changed.
+
+    Args:
+        sources: Files recorded by `describe_sources` when the index was built.
+        defaults_dir: Folder holding `default.ini` and `default_SandboxVars.lua`.
+        presets_dir: Folder holding the Sandbox presets (`<name>.lua`).
+
+    Returns:
+        True if a file was edited, added or removed.
+
+    Raises:
+        OSError: If a file cannot be read.
+
+    """
+    files = _list_sources(defaults_dir, presets_dir)
+    if not isinstance(sources, dict) or set(files) != set(sources):
+        return True
+
+    for key, path in files.items():
+        stat, recorded = path.stat(), sources[key]
+        if (stat.st_mtime_ns, stat.st_size) == (recorded.get("mtime_ns"), recorded.get("size")):
+            continue
+        if stat.st_size != recorded.get("size") or _hash_file(path) != recorded.get("hash"):
+            return True
+    return False
+
+
+def render_sandbox(content: str) -> str:
+    """Turn a Sandbox preset (a Lua `return {...}` chunk) into a SandboxVars file."""
+    return content.replace("return", "SandboxVars =")
+
+
+def _to_number(text: str) -> int | float:
+    """Convert a numeric string into an int when possible, a float otherwise."""
+    return int(text) if INT_RE.match(text) else float(text)
+
+
+def _infer_type(value: str) -> str:
+    """Infer the type of a key from its default value."""
+    if value in ("true", "false"):
+        return "bool"
+    if INT_RE.match(value):
+        return "int"
+    if FLOAT_RE.match(value):
+        return "float"
+    return "string"
+
+
+def _describe_key(key: str, value: str, line: int, comments: list[str]) -> dict:
+    """Build the index entry of a key from its default value and preceding comments."""
+    spec: dict = {"key": key, "line": line, "type": _infer_type(value), "default": value}
+    if spec["type"] not in ("int", "float"):
+        return spec
+
+    # The "-- 1 = ..." option lists of SandboxVars are not bounds: some are
+    # truncated and leave out valid values, including the default one
+    bounds = RANGE_RE.search(" ".join(comments))
+    if bounds:
+        spec["min"] = _to_number(bounds["min"])
+        spec["max"] = _to_number(bounds["max"])
+    return spec
+
+
+def parse_keys(content: str) -> dict[str, dict]:
+    """Parse the `key = value` pairs of an INI or SandboxVars file.
+
+    Args:
+        content: Content of the file to parse.
+
+    Returns:
+        A mapping of flatcase key to its description: original key name,
+        1-based line number, type, default value and, when the comments
+        declare it (`Minimum=... Maximum=...`), the allowed `min`/`max` range.
+
+    """
+    keys: dict[str, dict] = {}
+    comments: list[str] = []
+
+    for number, line in enumerate(content.splitlines(), start=1):
+        stripped = line.strip()
+        if stripped.startswith(("#", "--")):
+            comments.append(stripped)
+            continue
+
+        match = REGEX.match(stripped) if is_line_valid(stripped) else None
+        if match:
+            key, value = match.group(2), match.group(4)
+            keys[convert_to_flatcase(key)] = _describe_key(key, value, number, comments)
+        comments = []
+
+    return keys
+
+
+def check_value(spec: dict, value: str, *, strict_case: bool = False) -> str | None:
+    """Check an override value against the description of its key.
+
+    Args:
+        spec: Index entry of the key.
+        value: Value to check.
+        strict_case: Require lowercase booleans (Lua is case-sensitive).
+
+    Returns:
+        None if the value is valid, otherwise the reason why it is not.
+
+    """
+    kind = spec["type"]
+    if kind == "bool":
+        if (value if strict_case else value.lower()) not in ("true", "false"):
+            return "expected true or false"
+        return None
+
+    if kind not in ("int", "float"):
+        return None
+
+    try:
+        number = int(value) if kind == "int" else float(value)
+    except ValueError:
+        return "expected an integer" if kind == "int" else "expected a number"
+
+    if "min" in spec and not spec["min"] <= number <= spec["max"]:
+        return f"expected a value between {spec['min']} and {spec['max']}"
+    return None
+
+
+class DefaultsIndex:
+    """Precompiled view of the defaults directory and the Sandbox presets.
+
+    Attributes:
+        - data: Raw index content, as stored in `defaults_index.json`.
+        - logger: Configured logger instance for informational messages.
+
+    """
+
+    def __init__(self, data: dict, logger: logging.Logger | None = None) -> None:
+        """Initialize the index from its raw content."""
+        self.data = data
+        self.logger = logger or setup_logger()
+
+    @classmethod
+    def build(
+        cls,
+        defaults_dir: str,
+        presets_dir: str | None = None,
+        logger: logging.Logger | None = None,
+    ) -> "DefaultsIndex":
+        """Build the index from the default files and, optionally, the presets.
+
+        Args:
+            defaults_dir: Folder holding `default.ini` and `default_SandboxVars.lua`.
+            presets_dir: Folder holding the Sandbox presets (`<name>.lua`).
+            logger: Logger used by the index, a default one is set up when omitted.
+
+        Returns:
+            The built index.
+
+        Raises:
+            OSError: If the default files cannot be read.
+
+        """
+        ini_content = (Path(defaults_dir) / "default.ini").read_text(encoding="utf-8")
+        sandbox_content = render_sandbox(
+            (Path(defaults_dir) / "default_SandboxVars.lua").read_text(encoding="utf-8"),
+        )
+
+        presets: dict[str, str] = {}
+        if presets_dir and Path(presets_dir).is_dir():
+            presets = {
+                preset.stem: render_sandbox(preset.read_text(encoding="utf-8"))
+                for preset in sorted(Path(presets_dir).glob("*.lua"))
+            }
+
+        return cls(
+            {
+                "version": INDEX_VERSION,
+                "ini": {"content": ini_content, "keys": parse_keys(ini_content)},
+                "sandbox": {"content": sandbox_content, "keys": parse_keys(sandbox_content)},
+                "presets_dir": presets_dir or "",
+                "presets": presets,
+                "sources": describe_sources(defaults_dir, presets_dir),
+            },
+            logger,
+        )
+
+    @classmethod
+    def load(cls, defaults_dir: str, logger: logging.Logger | None = None) -> "DefaultsIndex":
+        """Load the precompiled index, building it from the defaults when unavailable or stale.
+
+        The index is stale when a default file or a preset was edited, added or
+        removed since it was built; it is then rebuilt from the same folders.
+        The fallback index of a missing or unreadable one does not include
+        presets, they are read from disk on demand.
+
+        Args:
+            defaults_dir: Folder holding the defaults and `defaults_index.json`.
+            logger: Logger used to report a missing or unreadable index.
+
+        Returns:
+            The loaded index.
+
+        """
+        logger = logger or setup_logger()
+        index_file = Path(defaults_dir) / INDEX_FILE_NAME
+        try:
+            data = json.loads(index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("Defaults index unavailable (%s), parsing the defaults instead", exc)
+            return cls.build(defaults_dir, logger=logger)
+
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            logger.warning("Defaults index %s is outdated, parsing the defaults instead", index_file)
+            return cls.build(defaults_dir, logger=logger)
+
+        presets_dir = data.get("presets_dir") or None
+        try:
+            stale = sources_changed(data.get("sources"), defaults_dir, presets_dir)
+        except OSError:
+            stale = True
+        if stale:
+            logger.warning("Defaults index %s is stale (defaults or presets changed), parsing them instead", index_file)
+            return cls.build(defaults_dir, presets_dir, logger=logger)
+
+        return cls(data, logger)
+
+    def save(self, defaults_dir: str) -> Path:
+        """Write the index as compact JSON into `defaults_dir` and return its path."""
+        index_file = Path(defaults_dir) / INDEX_FILE_NAME
+        index_file.write_text(json.dumps(self.data, separators=(",", ":")), encoding="utf-8")
+        return index_file
+
+    @property
+    def ini_content(self) -> str:
+        """Content of the default server INI."""
+        return self.data["ini"]["content"]
+
+    @property
+    def sandbox_content(self) -> str:
+        """Rendered content of the default SandboxVars."""
+        return self.data["sandbox"]["content"]
+
+    def get_preset(self, presets_dir: str, name: str) -> str | None:
+        """Return the rendered content of a preset, or None if it doesn't exist.
+
+        Presets are served from the index when it was built from the same
+        `presets_dir`, otherwise they are read from disk.
+        """
+        if presets_dir == self.data.get("presets_dir") and name in self.data.get("presets", {}):
+            return self.data["presets"][name]
+
+        preset_file = Path(presets_dir) / f"{name}.lua"
+        if not presets_dir or not preset_file.is_file():
+            return None
+        return render_sandbox(preset_file.read_text(encoding="utf-8"))
+
+    def check_overrides(self, env: dict, scope: str | None = None) -> dict:
+        """Drop the overrides whose value is invalid for the key they target.
+
+        Values are checked against the type and range of every INI and
+        SandboxVars key they would replace. Environment variables that match
+        no key but closely resemble one are reported as probable typos.
+
+        Args:
+            env: Mapping of environment variables.
+            scope: Restrict the overrides to the `ini` or `sandbox` keys;
+                overrides of keys from the other section are dropped.
+
+        Returns:
+            A copy of `env` without the invalid overrides.
+
+        """
+        sections = {"ini": self.data["ini"]["keys"], "sandbox": self.data["sandbox"]["keys"]}
+        if scope is not None:
+            sections = {scope: sections[scope]}
+        known = {flat: specs[flat]["key"] for specs in sections.values() for flat in specs}
+        accepted = dict(env)
+        rejected = 0
+
+        for name, value in env.items():
+            flat = convert_to_flatcase(name)
+            if flat not in known:
+                if scope is not None and flat in self.data["sandbox" if scope == "ini" else "ini"]["keys"]:
+                    self.logger.error("Rejected override %s=%r: not a key of the %s section", name, value, scope)
+                    accepted.pop(name, None)
+                    rejected += 1
+                    continue
+                self._report_typo(name, flat, known)
+                continue
+
+            for section, specs in sections.items():
+                spec = specs.get(flat)
+                reason = check_value(spec, value, strict_case=section == "sandbox") if spec else None
+                if reason:
+                    self.logger.error(
+                        "Rejected override %s=%r for %s key '%s' (line %d): %s",
+                        name,
+                        value,
+                        section,
+                        spec["key"],
+                        spec["line"],
+                        reason,
+                    )
+                    accepted.pop(name, None)
+                    rejected += 1
+                    break
+
+        if rejected:
+            self.logger.warning("%d override(s) rejected, the defaults are kept for them", rejected)
+        return accepted
+
+    def _report_typo(self, name: str, flat: str, known: dict[str, str]) -> None:
+        """Log a warning when an unknown variable looks like a misspelled key."""
+        if len(flat) < _MIN_TYPO_LENGTH:
+            return
+        matches = difflib.get_close_matches(flat, known, n=1, cutoff=_TYPO_CUTOFF)
+        if matches:
+            self.logger.warning("Unknown override %s is ignored, did you mean '%s'?", name, known[matches[0]])
+
+
+def main() -> None:
+    """Build the index from DEFAULTS_DIR and PRESETS_DIR and write it to DEFAULTS_DIR."""
+    logger = setup_logger()
+    defaults_dir = os.getenv("DEFAULTS_DIR", "/defaults")
+    server_dir = os.getenv("SERVER_DIR", "/pzomboid-server")
+    presets_dir = os.getenv("PRESETS_DIR", f"{server_dir}/media/lua/shared/Sandbox")
+
+    index = DefaultsIndex.build(defaults_dir, presets_dir)
+    index_file = index.save(defaults_dir)
+    logger.info(
+        "Indexed %d INI key(s), %d SandboxVars key(s) and %d preset(s) into %s",
+        len(index.data["ini"]["keys"]),
+        len(index.data["sandbox"]["keys"]),
+        len(index.data["presets"]),
+        index_file,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/bin/python3
+"""Readiness probe speaking the Steam server query protocol (A2S_INFO).
+
+The server only answers A2S_INFO once the world is loaded and it accepts
+players, so an answer means the server is ready, not just that the process is
+alive. A single UDP exchange is made per port (two when the server asks for a
+challenge), under a strict overall timeout. The ports tried are `PORT` then
+`STEAM_PORT_1` and `STEAM_PORT_2`, the first to answer wins.
+
+Exits with 0 and prints the server name, player count and map when the server
+answers, and with 1 otherwise. Used as the image `HEALTHCHECK`. A server
+started with `NO_STEAM=1` does not answer Steam queries, so it is not probed.
+
+Usage:
+
+    healthcheck.py [--host 127.0.0.1] [--port 16261] [--timeout 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import time
+
+A2S_HEADER = b"\xff\xff\xff\xff"
+A2S_INFO_REQUEST = A2S_HEADER + b"TSource Engine Query\x00"
+S2C_CHALLENGE = 0x41
+S2A_INFO = 0x49
+MAX_PACKET_SIZE = 1400
+
+DEFAULT_TIMEOUT_SECONDS = 2.0
+
+
+class ServerInfo:
+    """Fields of an A2S_INFO answer used to report readiness.
+
+    Attributes:
+        - name: Server name.
+        - map: Current map.
+        - players: Connected players.
+        - max_players: Player slots.
+
+    """
+
+    __slots__ = ("map", "max_players", "name", "players")
+
+    def __init__(self, name: str, map_name: str, players: int, max_players: int) -> None:
+        """Initialize the info from the decoded fields."""
+        self.name = name
+        self.map = map_name
+        self.players = players
+        self.max_players = max_players
+
+    @classmethod
+    def from_payload(cls, payload: bytes) -> ServerInfo:
+        """Decode the payload of an S2A_INFO answer (after the header and type byte).
+
+        Raises:
+            ValueError: If the payload is truncated.
+
+        """
+        # Protocol version, then the NUL-terminated name, map, folder and game
+        strings = []
+        offset = 1
+        for _ in range(4):
+            end = payload.find(b"\x00", offset)
+            if end < 0:
+                msg = "truncated A2S_INFO answer"
+                raise ValueError(msg)
+            strings.append(payload[offset:end].decode("utf-8", errors="replace"))
+            offset = end + 1
+
+        try:
+            _, players, max_players = struct.unpack_from("<hBB", payload, offset)
+        except struct.error as exc:
+            msg = "truncated A2S_INFO answer"
+            raise ValueError(msg) from exc
+        return cls(strings[0], strings[1], players, max_players)
+
+    def __str__(self) -> str:
+        """Describe the server on one line."""
+        return f"{self.name} | {self.players}/{self.max_players} players | map {self.map}"
+
+
+def query_info(host: str, port: int, timeout: float) -> ServerInfo:
+    """Query a server with A2S_INFO, answering its challenge if it sends one.
+
+    Args:
+        host: Address of the server.
+        port: Query port of the server.
+        timeout: Overall timeout of the exchange, in seconds.
+
+    Returns:
+        The decoded server info.
+
+    Raises:
+        OSError: If the server does not answer in time or the port is closed.
+        ValueError: If the answer is not a valid A2S_INFO answer.
+
+    """
+    deadline = time.monotonic() + timeout
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.connect((host, port))
+        request = A2S_INFO_REQUEST
+        for _ in range(2):
+            sock.settimeout(max(deadline - time.monotonic(), 0.001))
+            sock.send(request)
+            packet = sock.recv(MAX_PACKET_SIZE)
+            if not packet.startswith(A2S_HEADER) or len(packet) < len(A2S_HEADER) + 1:
+                msg = "unexpected answer to A2S_INFO"
+                raise ValueError(msg)
+
+            kind, payload = packet[4], packet[5:]
+            if kind == S2A_INFO:
+                return ServerInfo.from_payload(payload)
+            if kind != S2C_CHALLENGE:
+                msg = f"unexpected A2S answer type 0x{kind:02x}"
+                raise ValueError(msg)
+            request = A2S_INFO_REQUEST + payload[:4]
+
+    msg = "server kept answering A2S_INFO with a challenge"
+    raise ValueError(msg)
+
+
+def get_query_ports(env: dict) -> list[int]:
+    """Return the ports to query, in order, from `PORT`, `STEAM_PORT_1` and `STEAM_PORT_2`."""
+    ports = []
+    for name, default in (("PORT", "16261"), ("STEAM_PORT_1", ""), ("STEAM_PORT_2", "")):
+        raw = (env.get(name) or default).strip()
+        if raw.isdigit() and int(raw) not in ports:
+            ports.append(int(raw))
+    return ports
+
+
+def main() -> None:
+    """Probe the local server and report its readiness through the exit code."""
+    env = dict(os.environ)
+    parser = argparse.ArgumentParser(description="Check that the server answers Steam queries (A2S_INFO).")
+    parser.add_argument("--host", default=env.get("IP") or "127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, action="append", help="query port, may be repeated")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS, help="overall timeout in seconds")
+    args = parser.parse_args()
+
+    if (env.get("NO_STEAM") or "").lower() in {"1", "true"} and not args.port:
+        print("Steam queries are disabled (NO_STEAM), nothing to probe")  # noqa: T201
+        return
+
+    ports = args.port or get_query_ports(env)
+    deadline = time.monotonic() + args.timeout
+    errors = []
+    for index, port in enumerate(ports):
+        # Each port left gets an equal share of the remaining time
+        remaining = (deadline - time.monotonic()) / (len(ports) - index)
+        try:
+            info = query_info(args.host, port, remaining)
+        except (OSError, ValueError) as exc:
+            errors.append(f"{port}: {exc or type(exc).__name__}")
+            continue
+        print(info)  # noqa: T201
+        return
+
+    print(f"Server at {args.host} is not ready ({'; '.join(errors)})")  # noqa: T201
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/bin/python3
+"""Rotation, compression and retention of the server logs.
+
+Opt-in with `LOG_ROTATION=1` (it deletes old logs). The entrypoint runs a pass
+before the server starts, then this worker keeps running at the lowest CPU
+priority, started by the supervisor (`SUPERVISOR=1`) which stops it with the
+server, or in the background by the entrypoint otherwise. It keeps
+`${CACHE_DIR}/Logs` and `server-console.txt` from filling the data volume on
+long-running servers:
+
+- Log files that no process holds open and that were not written for
+  `LOG_ROTATE_IDLE_SECONDS` are compressed next to themselves, streaming in
+  fixed-size chunks, then removed. The `server-console.txt` of the previous run
+  is archived into `Logs` the same way once the server released it. Files the
+  JVM has open are never read, copied or truncated.
+- Archives older than `LOG_RETENTION_DAYS` are deleted, then the oldest ones
+  until the archives fit in `LOG_RETENTION_MB` (`0` disables a limit).
+
+On SIGTERM the worker stops after the log being compressed; the partial archive
+of a worker killed mid-way is removed by the next pass.
+
+Archives use gzip, or zstd when `LOG_COMPRESSION=zstd` and a zstd module
+(`compression.zstd` or `zstandard`) is available.
+
+Usage:
+
+    log_rotation.py            # single pass, before the server starts
+    log_rotation.py --watch    # pass every LOG_ROTATE_INTERVAL seconds
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import shutil
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from utils import get_open_files, load_custom_variables, setup_logger
+
+if TYPE_CHECKING:
+    import logging
+    from collections.abc import Callable
+
+ARCHIVE_SUFFIXES = (".gz", ".zst")
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_SETTINGS = {
+    "LOG_ROTATE_INTERVAL": 3600,
+    "LOG_ROTATE_IDLE_SECONDS": 600,
+    "LOG_RETENTION_DAYS": 14,
+    "LOG_RETENTION_MB": 512,
+}
+
+
+def get_zstd_opener() -> Callable[[Path], BinaryIO] | None:
+    """Return a function opening a zstd file for writing, or None when no zstd module is installed."""
+    try:
+        from compression import zstd  # noqa: PLC0415
+    except ImportError:
+        try:
+            import zstandard as zstd  # noqa: PLC0415
+        except ImportError:
+            return None
+    return lambda path: zstd.open(path, "wb")
+
+
+class LogRotator:
+    """Compress the server logs once released and enforce their retention.
+
+    Attributes:
+        - logger: Logger used to report archived and deleted files.
+        - logs_dir: Folder of the server logs (`${CACHE_DIR}/Logs`).
+        - console_file: Console log of the server (`${CACHE_DIR}/server-console.txt`).
+        - compression: Archive format, `gzip` or `zstd`.
+        - settings: Intervals and retention limits (see `DEFAULT_SETTINGS`).
+        - stop_requested: Set when the worker is asked to stop.
+
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        cache_dir: str,
+        compression: str = "gzip",
+        settings: dict[str, int] | None = None,
+    ) -> None:
+        """Initialize the rotator of a server cache folder."""
+        self.logger = logger
+        self.logs_dir = Path(cache_dir) / "Logs"
+        self.console_file = Path(cache_dir) / "server-console.txt"
+        self.compression = compression
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.stop_requested = threading.Event()
+
+    @classmethod
+    def from_env(cls, env: dict, logger: logging.Logger) -> LogRotator:
+        """Create a rotator from `CACHE_DIR`, `LOG_COMPRESSION` and the `LOG_*` limits.
+
+        Invalid values are reported and replaced by their defaults.
+        """
+        settings = dict(DEFAULT_SETTINGS)
+        for name, default in DEFAULT_SETTINGS.items():
+            raw = (env.get(name) or "").strip()
+            if not raw:
+                continue
+            if raw.isdigit():
+                settings[name] = int(raw)
+            else:
+                logger.warning("Invalid %s=%r, using %d", name, raw, default)
+
+        compression = (env.get("LOG_COMPRESSION") or "gzip").strip().lower()
+        if compression not in {"gzip", "zstd"}:
+            logger.warning("Invalid LOG_COMPRESSION=%r, using gzip", compression)
+            compression = "gzip"
+        return cls(logger, env.get("CACHE_DIR", "/root/Zomboid"), compression, settings)
+
+    def _get_archive_format(self) -> tuple[str, Callable[[Path], BinaryIO]]:
+        """Return the archive suffix and opener, falling back to gzip without a zstd module."""
+        if self.compression == "zstd":
+            opener = get_zstd_opener()
+            if opener is not None:
+                return ".zst", opener
+            self.logger.warning("No zstd module installed, compressing logs with gzip")
+            self.compression = "gzip"
+        return ".gz", lambda path: gzip.open(path, "wb")
+
+    def compress(self, source: Path, archive_name: str | None = None) -> bool:
+        """Compress a released log file, streaming it in chunks, then remove it.
+
+        The archive is written under a temporary name and renamed once complete,
+        and keeps the modification time of the log for the age retention.
+
+        Args:
+            source: Log file to archive.
+            archive_name: Name of the log inside `logs_dir`, when it must be moved there.
+
+        Returns:
+            True if the log was archived.
+
+        """
+        suffix, open_archive = self._get_archive_format()
+        placed = self.logs_dir / archive_name if archive_name else source
+        archive = placed.with_name(placed.name + suffix)
+        counter = 0
+        while archive.exists():
+            counter += 1
+            archive = placed.with_name(f"{placed.name}.{counter}{suffix}")
+
+        temporary = archive.with_name(f".{archive.name}.tmp")
+        try:
+            mtime = source.stat().st_mtime
+            with source.open("rb") as log, open_archive(temporary) as stream:
+                shutil.copyfileobj(log, stream, CHUNK_SIZE)
+            os.utime(temporary, (mtime, mtime))
+            temporary.replace(archive)
+            source.unlink()
+        except OSError as exc:
+            self.logger.error("Failed to archive %s: %s", source, exc)
+            temporary.unlink(missing_ok=True)
+            return False
+        return True
+
+    def get_released_logs(self) -> list[Path]:
+        """Return the uncompressed logs no process holds open.
+
+        Logs under `logs_dir` must also be idle for `LOG_ROTATE_IDLE_SECONDS`,
+        in case a logger reopens its file. The console log is only written by
+        the server, which truncates it when it starts, so it is released as soon
+        as no process holds it.
+        """
+        open_files = get_open_files()
+        idle_before = time.time() - self.settings["LOG_ROTATE_IDLE_SECONDS"]
+        candidates = [path for path in self.logs_dir.rglob("*") if not path.name.endswith(ARCHIVE_SUFFIXES)]
+        candidates.append(self.console_file)
+
+        released = []
+        for path in candidates:
+            try:
+                stat = path.lstat()
+            except OSError:
+                continue
+            if not path.is_file() or path.is_symlink() or path.name.startswith("."):
+                continue
+            idle = stat.st_mtime < idle_before or path == self.console_file
+            if idle and path.resolve() not in open_files:
+                released.append(path)
+        return released
+
+    def rotate(self) -> int:
+        """Archive every released log.
+
+        Returns:
+            The amount of archived logs.
+
+        """
+        archived = 0
+        for path in self.get_released_logs():
+            if self.stop_requested.is_set():
+                break
+            archive_name = None
+            if path == self.console_file:
+                stamp = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime(path.stat().st_mtime))
+                archive_name = f"server-console_{stamp}.txt"
+            if self.compress(path, archive_name):
+                archived += 1
+        return archived
+
+    def enforce_retention(self) -> int:
+        """Delete the archives past the age limit, then the oldest ones past the size limit.
+
+        Returns:
+            The amount of deleted archives.
+
+        """
+        archives = []
+        for path in self.logs_dir.rglob("*"):
+            if path.name.endswith(ARCHIVE_SUFFIXES) and not path.name.startswith(".") and path.is_file():
+                stat = path.stat()
+                archives.append((stat.st_mtime, stat.st_size, path))
+        archives.sort()
+
+        # A limit of 0 disables it
+        days, megabytes = self.settings["LOG_RETENTION_DAYS"], self.settings["LOG_RETENTION_MB"]
+        expire_before = time.time() - days * 86400 if days else 0
+        total_size = sum(size for _, size, _ in archives)
+        max_size = megabytes * 1024 * 1024 if megabytes else total_size
+
+        deleted = 0
+        for mtime, size, path in archives:
+            if mtime >= expire_before and total_size <= max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+            deleted += 1
+            # Session folders emptied by the retention
+            if path.parent != self.logs_dir and not any(path.parent.iterdir()):
+                path.parent.rmdir()
+        return deleted
+
+    def remove_partial_archives(self) -> None:
+        """Remove the temporary archives left by a pass that was killed mid-way."""
+        for path in self.logs_dir.rglob(".*.tmp"):
+            if path.name.endswith(tuple(f"{suffix}.tmp" for suffix in ARCHIVE_SUFFIXES)) and path.is_file():
+                path.unlink(missing_ok=True)
+
+    def run_once(self) -> None:
+        """Run a rotation pass followed by the retention."""
+        if not self.logs_dir.is_dir():
+            self.logs_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self.remove_partial_archives()
+            archived = self.rotate()
+            deleted = self.enforce_retention()
+        except OSError as exc:
+            self.logger.error("Log rotation failed: %s", exc)
+            return
+        if archived or deleted:
+            self.logger.info("Log rotation: archived:%d, deleted:%d", archived, deleted)
+
+    def watch(self) -> None:
+        """Run a pass every `LOG_ROTATE_INTERVAL` seconds, at the lowest CPU priority.
+
+        The first pass runs after one interval: the boot pass runs in the
+        foreground before the server starts. Returns once asked to stop.
+        """
+        os.nice(19)
+        while not self.stop_requested.wait(max(self.settings["LOG_ROTATE_INTERVAL"], 60)):
+            self.run_once()
+
+    def request_stop(self, _signum: int, _frame: object = None) -> None:
+        """Signal handler asking the worker to stop after the current log."""
+        self.stop_requested.set()
+
+
+def main() -> None:
+    """Rotate the server logs once, or keep rotating them with `--watch`."""
+    parser = argparse.ArgumentParser(description="Compress released server logs and enforce their retention.")
+    parser.add_argument("--watch", action="store_true", help="keep running, one pass per LOG_ROTATE_INTERVAL")
+    args = parser.parse_args()
+
+    rotator = LogRotator.from_env(load_custom_variables(), setup_logger())
+    if args.watch:
+        signal.signal(signal.SIGTERM, rotator.request_stop)
+        signal.signal(signal.SIGINT, rotator.request_stop)
+        rotator.watch()
+    else:
+        rotator.run_once()
+
+
+if __name__ == "__main__":
+    main()
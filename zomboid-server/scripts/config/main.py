@@ -2,6 +2,9 @@
 
 import os
 
+from boot_budget import BootBudget
+from defaults_index import DefaultsIndex
+from server_fleet import ProjectZomboidServerFleet, load_spec
 from server_manager import ProjectZomboidServerManager
 from utils import load_custom_variables, log_section, setup_logger
 from workshop_manager import ProjectZomboidWorkshopManager
@@ -15,11 +18,32 @@ def main() -> None:
     server_folder = variables.get("SERVER_DIR")
     steam_workshop_folder = variables.get("STEAM_WORKSHOP_DEFAULT_DIR")
 
+    # Reject invalid overrides up front, before spending time on the workshop
+    log_section(logger, "Configuration overrides")
+
+    index = DefaultsIndex.load(variables.get("DEFAULTS_DIR", "/defaults"), logger)
+    variables = index.check_overrides(variables)
+
+    # A single deadline and circuit breaker bound every network-dependent step
+    budget = BootBudget.from_env(variables, logger)
+
+    # A spec file describing several servers replaces the single-server pipeline
+    spec_file = variables.get("SERVERS_SPEC_FILE")
+    if spec_file:
+        try:
+            spec = load_spec(spec_file)
+        except (OSError, ValueError) as exc:
+            logger.error("Invalid servers spec %s, using the environment instead: %s", spec_file, exc)
+        else:
+            ProjectZomboidServerFleet(spec, variables, index, budget).apply_configuration()
+            return
+
     # Exectute the workshop manager first to ensure mods are in place
     log_section(logger, "Workshop management")
 
-    wk_manager = ProjectZomboidWorkshopManager(server_folder, steam_workshop_folder)
+    wk_manager = ProjectZomboidWorkshopManager(server_folder, steam_workshop_folder, budget)
     wk_manager.process_workshop_items()
+    budget.report()
 
     # Update the WORKSHOP_ITEMS variable to reflect only successfully processed items
     variables["WORKSHOP_ITEMS"] = ";".join(wk_manager.server_workshop_items)
@@ -37,7 +61,7 @@ def main() -> None:
     log_section(logger, "Server configuration")
 
     # Then proceed with server configuration
-    server_manager = ProjectZomboidServerManager(variables)
+    server_manager = ProjectZomboidServerManager(variables, index)
     server_manager.apply_configuration()
 
 
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import heapq
+import os
+import re
+from itertools import combinations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import logging
+    from pathlib import Path
+
+# Each loaded cell of a map ships a "<x>_<y>.lotheader" file
+LOTHEADER_RE = re.compile(r"^(?P<x>-?\d+)_(?P<y>-?\d+)\.lotheader$")
+# Cells of the worldmap.xml used by maps that don't ship lot headers
+WORLDMAP_CELL_RE = re.compile(r'<cell\s+x="(?P<x>-?\d+)"\s+y="(?P<y>-?\d+)"')
+# "lots=<map>" lines of a map.info: maps this map is placed over
+LOTS_RE = re.compile(r"^\s*lots\s*=\s*(?P<map>[^\r\n]*?)\s*$", re.MULTILINE | re.IGNORECASE)
+
+# Conflicting cells listed per overlap in the logs
+MAX_LOGGED_CELLS = 5
+
+
+class MapCellIndex:
+    """Spatial index of the world cells claimed by each map.
+
+    Cells are read from the names of the `.lotheader` files of each map folder
+    (or from `worldmap.xml` when there are none) into a hash grid keyed by
+    cell coordinates, so overlaps are found in a single pass over the cells.
+    The `lots=` lines of each `map.info` declare the maps it is placed over,
+    which must come after it in the `MAP` order (the first map listed wins a
+    contested cell).
+
+    Attributes:
+        - logger: Logger used to report overlaps and ordering issues.
+        - cells: Mapping of (x, y) cell coordinates to the maps claiming it.
+        - lots: Mapping of map name to the maps it declares it is placed over.
+
+    """
+
+    def __init__(self, logger: logging.Logger) -> None:
+        """Initialize an empty index."""
+        self.logger = logger
+        self.cells: dict[tuple[int, int], list[str]] = {}
+        self.lots: dict[str, list[str]] = {}
+
+    def add_map(self, name: str, map_path: Path) -> int:
+        """Index the cells of a map folder and read its declared lots.
+
+        Args:
+            name: Name of the map (its folder name under `media/maps`).
+            map_path: Path to the map folder.
+
+        Returns:
+            The amount of cells the map claims.
+
+        """
+        map_cells = set()
+        try:
+            with os.scandir(map_path) as scan:
+                for entry in scan:
+                    match = LOTHEADER_RE.match(entry.name)
+                    if match:
+                        map_cells.add((int(match["x"]), int(match["y"])))
+        except OSError as exc:
+            self.logger.error("Could not list the cells of map %s: %s", name, exc)
+
+        try:
+            if not map_cells and (map_path / "worldmap.xml").is_file():
+                content = (map_path / "worldmap.xml").read_text(encoding="utf-8", errors="replace")
+                map_cells = {(int(match["x"]), int(match["y"])) for match in WORLDMAP_CELL_RE.finditer(content)}
+            if (map_path / "map.info").is_file():
+                content = (map_path / "map.info").read_text(encoding="utf-8-sig", errors="replace")
+                self.lots[name] = [match["map"] for match in LOTS_RE.finditer(content) if match["map"] != name]
+        except OSError as exc:
+            self.logger.error("Could not read the files of map %s: %s", name, exc)
+
+        for cell in map_cells:
+            self.cells.setdefault(cell, []).append(name)
+        return len(map_cells)
+
+    def get_overlaps(self) -> dict[tuple[str, str], list[tuple[int, int]]]:
+        """Return the cells claimed by more than one map, keyed by pair of maps (sorted)."""
+        overlaps: dict[tuple[str, str], list[tuple[int, int]]] = {}
+        for cell, maps in self.cells.items():
+            for pair in combinations(sorted(maps), 2):
+                overlaps.setdefault(pair, []).append(cell)
+        return overlaps
+
+    def declares_over(self, first: str, second: str) -> bool:
+        """Check whether `first` declares it is placed over `second`."""
+        return second in self.lots.get(first, [])
+
+    def report_overlaps(self) -> int:
+        """Log the overlapping maps, warning about the ones with no declared priority.
+
+        Returns:
+            The amount of overlapping pairs without a declared priority.
+
+        """
+        conflicts = 0
+        for (first, second), cells in sorted(self.get_overlaps().items()):
+            sample = ", ".join(f"{x},{y}" for x, y in sorted(cells)[:MAX_LOGGED_CELLS])
+            if self.declares_over(first, second) or self.declares_over(second, first):
+                over, under = (first, second) if self.declares_over(first, second) else (second, first)
+                self.logger.info("Map %s is placed over %s on %d cell(s) as declared", over, under, len(cells))
+                continue
+
+            conflicts += 1
+            self.logger.warning(
+                "Maps %s and %s both claim %d cell(s) (%s%s): the first in MAP wins them",
+                first,
+                second,
+                len(cells),
+                sample,
+                ", ..." if len(cells) > MAX_LOGGED_CELLS else "",
+            )
+        return conflicts
+
+    def suggest_order(self, maps: list[str]) -> list[str]:
+        """Order maps so each one comes before the maps it is declared to be placed over.
+
+        The given order is kept wherever no declaration applies. Cyclic
+        declarations are reported and the maps involved keep their given order.
+
+        Args:
+            maps: Map names in their current order.
+
+        Returns:
+            The suggested order.
+
+        """
+        position = {name: i for i, name in enumerate(maps)}
+        successors = {name: [under for under in self.lots.get(name, []) if under in position] for name in maps}
+        pending = dict.fromkeys(maps, 0)
+        for unders in successors.values():
+            for under in unders:
+                pending[under] += 1
+
+        ready = [position[name] for name in maps if not pending[name]]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            name = maps[heapq.heappop(ready)]
+            order.append(name)
+            for under in successors[name]:
+                pending[under] -= 1
+                if not pending[under]:
+                    heapq.heappush(ready, position[under])
+
+        cyclic = [name for name in maps if name not in order]
+        if cyclic:
+            self.logger.error("Maps declare each other in a cycle through lots=, keeping their order: %s", cyclic)
+        return order + cyclic
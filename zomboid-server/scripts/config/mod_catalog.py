@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import logging
+    from collections.abc import Iterator
+    from pathlib import Path
+
+# One "key=value" line of a mod.info file
+MOD_INFO_LINE_RE = re.compile(r"^\s*(?P<key>\w+)\s*=\s*(?P<value>[^\r\n]*?)\s*$", re.MULTILINE)
+
+# mod.info keys that may appear several times, or hold a comma-separated list
+LIST_KEYS = ("require", "pack", "tiledef")
+
+def parse_mod_info(content: str) -> dict:
+    r"""Parse the content of a mod.info file.
+
+    Args:
+        content: Content of the mod.info file.
+
+    Returns:
+        A dictionary with the `id`, `name`, `require`, `pack`, `tiledef`,
+        `version_min` and `version_max` of the mod. List keys are merged
+        across repeated lines; `require` entries lose the leading backslash
+        used by Build 42 (`require=\ModA,\ModB`).
+
+    """
+    info: dict = {"id": None, "name": None, "version_min": None, "version_max": None}
+    info.update({key: [] for key in LIST_KEYS})
+
+    for match in MOD_INFO_LINE_RE.finditer(content):
+        key, value = match["key"].lower(), match["value"]
+        if key == "require":
+            info["require"] += [req.strip().lstrip("\\") for req in value.split(",") if req.strip().lstrip("\\")]
+        elif key in ("pack", "tiledef"):
+            info[key].append(value)
+        elif key in ("id", "name") and info[key] is None:
+            info[key] = value
+        elif key == "versionmin":
+            info["version_min"] = value
+        elif key == "versionmax":
+            info["version_max"] = value
+
+    return info
+
+
+class ModCatalog:
+    """Catalog of the mods shipped by the downloaded Workshop items.
+
+    Every `mod.info` found under `<item>/mods/*/` (and the Build 42 versioned
+    sub-folders) is parsed once. The catalog is then used to compute a load
+    order that places each mod after the mods it requires, reporting cycles
+    and missing requirements before the server is launched.
+
+    Attributes:
+        - logger: Logger used to report parsing and ordering issues.
+        - mods: Mapping of mod ID to its parsed mod.info plus the `path` it was read from.
+
+    """
+
+    def __init__(self, logger: logging.Logger) -> None:
+        """Initialize an empty catalog.
+
+        Args:
+            logger: Logger used to report parsing and ordering issues.
+
+        """
+        self.logger = logger
+        self.mods: dict[str, dict] = {}
+
+    def scan(self, workshop_item_folders: list[Path]) -> ModCatalog:
+        """Add the mods of the given Workshop item folders to the catalog.
+
+        The first mod.info found for a given mod ID wins.
+
+        Args:
+            workshop_item_folders: Folders of the Workshop items (`<content>/<id>`).
+
+        Returns:
+            The catalog itself, to allow chaining.
+
+        """
+        for item_folder in workshop_item_folders:
+            mods_folder = item_folder / "mods"
+            if not mods_folder.is_dir():
+                continue
+
+            for mod_info_file in sorted([*mods_folder.glob("*/mod.info"), *mods_folder.glob("*/*/mod.info")]):
+                try:
+                    content = mod_info_file.read_text(encoding="utf-8-sig", errors="replace")
+                except OSError as exc:
+                    self.logger.error("Error reading %s: %s", mod_info_file, exc)
+                    continue
+
+                info = parse_mod_info(content)
+                if info["id"] and info["id"] not in self.mods:
+                    info["path"] = str(mod_info_file.parent)
+                    self.mods[info["id"]] = info
+
+        self.logger.info("Mod catalog contains %d mod(s)", len(self.mods))
+        return self
+
+    def get_requirements(self, mod_id: str) -> list[str]:
+        """Return the mod IDs required by a mod, empty when it is not in the catalog."""
+        return self.mods.get(mod_id, {}).get("require", [])
+
+    def _get_active_requirements(self, mod_id: str, active: set[str]) -> Iterator[str]:
+        """Yield the requirements of a mod that are part of the active mods."""
+        return (required for required in self.get_requirements(mod_id) if required in active)
+
+    def find_cycles(self, mod_ids: list[str]) -> list[list[str]]:
+        """Find the groups of mods that require each other, directly or not.
+
+        Runs in linear time (an iterative Tarjan traversal of the requirement
+        graph restricted to `mod_ids`).
+
+        Args:
+            mod_ids: Active mod IDs in their preferred order.
+
+        Returns:
+            Every requirement cycle, as the mods involved in their given order.
+
+        """
+        active = set(mod_ids)
+        position = {mod_id: number for number, mod_id in reversed(list(enumerate(mod_ids)))}
+        index: dict[str, int] = {}
+        low: dict[str, int] = {}
+        stack: list[str] = []
+        on_stack: set[str] = set()
+        cycles: list[list[str]] = []
+
+        for root in mod_ids:
+            if root in index:
+                continue
+
+            work = [(root, self._get_active_requirements(root, active))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                mod_id, requirements = work[-1]
+                required = next(requirements, None)
+                if required is None:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[mod_id])
+                    if low[mod_id] == index[mod_id]:
+                        component = self._pop_component(stack, on_stack, mod_id)
+                        if self._is_cycle(component):
+                            cycles.append(sorted(component, key=position.__getitem__))
+                elif required not in index:
+                    work.append((required, self._get_active_requirements(required, active)))
+                    index[required] = low[required] = len(index)
+                    stack.append(required)
+                    on_stack.add(required)
+                elif required in on_stack:
+                    low[mod_id] = min(low[mod_id], index[required])
+        return cycles
+
+    @staticmethod
+    def _pop_component(stack: list[str], on_stack: set[str], root: str) -> list[str]:
+        """Pop the mods of a strongly connected component off the traversal stack, down to its root."""
+        component = [stack.pop()]
+        while component[-1] != root:
+            component.append(stack.pop())
+        on_stack.difference_update(component)
+        return component
+
+    def _is_cycle(self, component: list[str]) -> bool:
+        """Check whether a strongly connected component is a cycle (several mods, or a mod requiring itself)."""
+        return len(component) > 1 or component[0] in self.get_requirements(component[0])
+
+    def _get_ordering_requirements(
+        self,
+        mod_id: str,
+        position: dict[str, int],
+        cycle_of: dict[str, int],
+    ) -> Iterator[str]:
+        """Yield the requirements of a mod, without those closing a cycle.
+
+        Between the mods of a cycle, only the requirements on mods given
+        earlier are kept, which breaks the cycle in the given order.
+        """
+        cycle = cycle_of.get(mod_id)
+        for required in self.get_requirements(mod_id):
+            if cycle is None or cycle_of.get(required) != cycle or position[required] < position[mod_id]:
+                yield required
+
+    def resolve_load_order(self, mod_ids: list[str]) -> list[str]:
+        """Order the given mods so that every mod loads after the mods it requires.
+
+        The order is stable: mods keep their relative position unless a
+        requirement forces one of them earlier, in which case the requirement
+        is moved right before the first mod that needs it. Runs in linear time
+        (depth-first traversals of the requirement graph).
+
+        Requirements that are not part of `mod_ids` are reported as missing.
+        Requirement cycles are reported and broken by ignoring, between the
+        mods of a cycle, the requirements on mods given later in `mod_ids`, so
+        the mods involved keep their given order.
+
+        Args:
+            mod_ids: Active mod IDs in their preferred order.
+
+        Returns:
+            The same mod IDs in load order.
+
+        """
+        active = set(mod_ids)
+        position = {mod_id: number for number, mod_id in reversed(list(enumerate(mod_ids)))}
+        cycle_of: dict[str, int] = {}
+        for number, cycle in enumerate(self.find_cycles(mod_ids)):
+            self.logger.error("Mod requirement cycle detected: %s; keeping their given order", ", ".join(cycle))
+            cycle_of.update(dict.fromkeys(cycle, number))
+
+        seen: set[str] = set()
+        order: list[str] = []
+        missing: set[tuple[str, str]] = set()
+
+        for root in mod_ids:
+            if root in seen:
+                continue
+
+            seen.add(root)
+            stack = [(root, self._get_ordering_requirements(root, position, cycle_of))]
+            while stack:
+                mod_id, requirements = stack[-1]
+                for required in requirements:
+                    if required not in active:
+                        missing.add((mod_id, required))
+                    elif required not in seen:
+                        seen.add(required)
+                        stack.append((required, self._get_ordering_requirements(required, position, cycle_of)))
+                        break
+                else:
+                    stack.pop()
+                    order.append(mod_id)
+
+        for mod_id, required in sorted(missing):
+            reason = "is not in MODS" if required in self.mods else "is not provided by any Workshop item"
+            self.logger.error("Mod %s requires %s, which %s", mod_id, required, reason)
+
+        if order != mod_ids:
+            self.logger.info("Mod load order adjusted to satisfy requirements")
+        return order
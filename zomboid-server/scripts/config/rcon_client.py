@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import shlex
+import subprocess
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import logging
+
+RCON_TIMEOUT_SECONDS = 10
+# Commands sent per `rcon` invocation (one connection and authentication each)
+RCON_BATCH_SIZE = 50
+
+
+def quote(value: str) -> str:
+    """Quote an argument of a server console command.
+
+    The console has no escape sequence, so a value containing a double quote or
+    a line break cannot be passed as a single argument.
+
+    Raises:
+        ValueError: If the value cannot be quoted.
+
+    """
+    value = str(value)
+    if any(char in value for char in '"\r\n'):
+        msg = f"{value!r} contains a double quote or a line break"
+        raise ValueError(msg)
+    return f'"{value}"'
+
+
+class RconClient:
+    """Send commands to the running server through the bundled `rcon` CLI.
+
+    The `rcon` binary (gorcon) installed with the admin console accepts several
+    commands per invocation, so commands are sent in batches over a single
+    authenticated connection each.
+
+    Attributes:
+        - logger: Logger used to report failures.
+        - address: RCON `host:port` of the server.
+        - password: RCON password.
+
+    """
+
+    def __init__(self, logger: logging.Logger, host: str, port: str, password: str) -> None:
+        """Initialize the client with the RCON address and password."""
+        self.logger = logger
+        self.address = f"{host}:{port}"
+        self.password = password
+
+    @classmethod
+    def from_env(cls, env: dict, logger: logging.Logger) -> RconClient:
+        """Create a client from `RCON_HOST`, `RCON_PORT` and `RCON_PASSWORD`."""
+        return cls(
+            logger,
+            env.get("RCON_HOST") or "localhost",
+            env.get("RCON_PORT") or "27015",
+            env.get("RCON_PASSWORD") or "admin",
+        )
+
+    def run(self, commands: list[str], timeout: float = RCON_TIMEOUT_SECONDS) -> list[str] | None:
+        """Send console commands to the server.
+
+        Args:
+            commands: Console commands (e.g. `save`, `setaccesslevel "bob" "admin"`).
+            timeout: Timeout of each batch, in seconds.
+
+        Returns:
+            The output of each batch, or None as soon as a batch fails.
+
+        """
+        outputs = []
+        for start in range(0, len(commands), RCON_BATCH_SIZE):
+            batch = commands[start : start + RCON_BATCH_SIZE]
+            try:
+                result = subprocess.run(  # noqa: S603
+                    ["rcon", "-a", self.address, "-p", self.password, *batch],  # noqa: S607
+                    check=False,
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout,
+                )
+            except (OSError, subprocess.TimeoutExpired) as exc:
+                self.logger.error("RCON command %s failed: %s", shlex.quote(batch[0]), exc)
+                return None
+
+            if result.returncode != 0:
+                self.logger.error(
+                    "RCON command %s failed: %s",
+                    shlex.quote(batch[0]),
+                    (result.stderr or result.stdout).strip(),
+                )
+                return None
+            outputs.append(result.stdout)
+        return outputs
@@ -0,0 +1,356 @@
+#!/bin/python3
+"""Bulk management of the whitelist, bans and access levels of a server.
+
+Project Zomboid keeps its accounts in the SQLite database
+`${CACHE_DIR}/db/<server>.db`. This tool imports and exports those tables as
+CSV or JSON in a single transaction, deduplicating rows on the indexed column
+of each table (username, Steam ID or IP).
+
+Writing to the database while the server has it open would be overwritten or
+corrupt it, so imports and deletions are refused in that case unless `--rcon`
+is given: the rows are then translated into console commands and sent through
+RCON, batched over as few connections as possible. The database only stores
+password hashes, which `adduser` would take as the password itself, so
+whitelist rows with a hashed password (e.g. from an export) are skipped over
+RCON and can only be imported with the server stopped. Conversely, rows with a
+plain password are skipped by direct imports, which would store it where the
+server expects a hash; they can only be imported over RCON. Rows with a value
+the console cannot quote (a double quote or a line break) are skipped over RCON.
+
+Empty CSV fields are written as NULL to the columns that allow it.
+
+Usage:
+
+    server_db.py export whitelist /root/Zomboid/whitelist.csv
+    server_db.py import whitelist members.json
+    server_db.py --rcon import bannedid bans.csv
+    server_db.py delete bannedip unbans.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rcon_client import RconClient, quote
+from utils import get_open_files, load_custom_variables, setup_logger
+
+if TYPE_CHECKING:
+    import logging
+
+# Tables managed by the tool and the indexed column identifying their rows
+TABLE_KEYS = {
+    "whitelist": "username",
+    "bannedid": "steamid",
+    "bannedip": "ip",
+}
+# Password hashes stored by the server (bcrypt)
+PASSWORD_HASH_PATTERN = re.compile(r"^\$2[abxy]?\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+
+def read_rows(file: str) -> list[dict]:
+    """Read rows from a CSV file (with a header line) or a JSON list of objects.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file is not a valid CSV or JSON list of objects.
+
+    """
+    path = Path(file)
+    if path.suffix.lower() == ".json":
+        rows = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            msg = f"{file} must contain a JSON list of objects"
+            raise ValueError(msg)
+        return rows
+
+    with path.open(encoding="utf-8-sig", newline="") as stream:
+        return list(csv.DictReader(stream))
+
+
+def write_rows(file: str, columns: list[str], rows: list[tuple]) -> None:
+    """Write rows to a CSV file (with a header line) or a JSON list of objects."""
+    path = Path(file)
+    if path.suffix.lower() == ".json":
+        path.write_text(json.dumps([dict(zip(columns, row, strict=True)) for row in rows], indent=2), encoding="utf-8")
+        return
+
+    with path.open("w", encoding="utf-8", newline="") as stream:
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def rcon_commands(table: str, row: dict, *, delete: bool = False) -> list[str]:
+    """Translate a row into the console commands applying it to a running server.
+
+    Returns:
+        The commands, or an empty list when the row cannot be applied over RCON.
+
+    Raises:
+        ValueError: If the row holds a password hash or a value the console cannot quote.
+
+    """
+    username = row.get("username")
+    if table == "whitelist":
+        if delete:
+            return [f"removeuserfromwhitelist {quote(username)}"]
+        if PASSWORD_HASH_PATTERN.match(str(row.get("password") or "")):
+            msg = "the password is a hash, adduser needs the plain password"
+            raise ValueError(msg)
+        commands = [f"adduser {quote(username)} {quote(row['password'])}"] if row.get("password") else []
+        if row.get("accesslevel"):
+            commands.append(f"setaccesslevel {quote(username)} {quote(row['accesslevel'])}")
+        return commands
+
+    if table == "bannedid":
+        return [f"{'unbanid' if delete else 'banid'} {row['steamid']}"]
+
+    # IP bans are issued and lifted through the user they were issued for
+    if not username:
+        return []
+    if delete:
+        return [f"unbanuser {quote(username)}"]
+    reason = f" -r {quote(row['reason'])}" if row.get("reason") else ""
+    return [f"banuser {quote(username)} -ip{reason}"]
+
+
+class ServerDatabase:
+    """Bulk operations on the accounts database of a Project Zomboid server.
+
+    Responsibilities:
+        - Import rows (insert or update) into a table in a single transaction.
+        - Delete rows by their indexed column in a single transaction.
+        - Export a table to CSV or JSON, also while the server is running.
+        - Refuse to write while the server holds the database.
+
+    Attributes:
+        - logger: Logger used to report progress and rejected rows.
+        - db_file: Path to the SQLite database (`${CACHE_DIR}/db/<server>.db`).
+        - server_name: Name of the server, stored as the `world` of new whitelist rows.
+
+    """
+
+    def __init__(self, logger: logging.Logger, db_file: str, server_name: str) -> None:
+        """Initialize the manager for one server database."""
+        self.logger = logger
+        self.db_file = Path(db_file)
+        self.server_name = server_name
+
+    def is_held_by_server(self) -> bool:
+        """Check whether another process (the server) has the database open."""
+        return self.db_file.resolve() in get_open_files()
+
+    def _connect(self, *, read_only: bool = False) -> sqlite3.Connection:
+        """Open the database, failing instead of creating it when it is missing."""
+        mode = "ro" if read_only else "rw"
+        return sqlite3.connect(f"file:{self.db_file}?mode={mode}", uri=True)
+
+    @staticmethod
+    def _columns(connection: sqlite3.Connection, table: str) -> list[str]:
+        """Return the columns of a table, in the order of its schema."""
+        return [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+
+    @staticmethod
+    def _nullable_columns(connection: sqlite3.Connection, table: str) -> set[str]:
+        """Return the columns of a table accepting NULL (neither NOT NULL nor the primary key)."""
+        return {row[1] for row in connection.execute(f"PRAGMA table_info({table})") if not row[3] and not row[5]}
+
+    def _deduplicate(
+        self,
+        table: str,
+        rows: list[dict],
+        columns: list[str],
+        nullable: set[str] | None = None,
+    ) -> dict[str, dict]:
+        """Key the rows by the indexed column of the table; the last duplicate wins.
+
+        Empty values (CSV has no NULL) are replaced by None in the `nullable` columns.
+        """
+        nullable = nullable or set()
+        key = TABLE_KEYS[table]
+        unknown = sorted({column for row in rows for column in row} - set(columns))
+        if unknown:
+            self.logger.warning("Ignoring unknown %s column(s): %s", table, ", ".join(unknown))
+
+        keyed: dict[str, dict] = {}
+        for row in rows:
+            value = str(row.get(key) or "").strip()
+            if not value:
+                self.logger.warning("Ignoring %s row without %s: %r", table, key, row)
+                continue
+            keyed[value] = {
+                column: None if row[column] == "" and column in nullable else row[column]
+                for column in columns
+                if column in row and column != "id"
+            }
+            keyed[value][key] = value
+
+        if len(keyed) < len(rows):
+            self.logger.info("%d duplicate or invalid row(s) merged", len(rows) - len(keyed))
+        return keyed
+
+    def import_rows(self, table: str, rows: list[dict]) -> tuple[int, int]:
+        """Insert new rows and update existing ones, in a single transaction.
+
+        Args:
+            table: Table to import into (see `TABLE_KEYS`).
+            rows: Rows to import; only the columns they contain are written.
+
+        Returns:
+            The amount of inserted and updated rows.
+
+        """
+        key = TABLE_KEYS[table]
+        with closing(self._connect()) as connection, connection:
+            columns = self._columns(connection, table)
+            keyed = self._deduplicate(table, rows, columns, self._nullable_columns(connection, table))
+            if table == "whitelist":
+                keyed = self._drop_plain_passwords(keyed)
+            existing = {row[0] for row in connection.execute(f"SELECT {key} FROM {table}")}  # noqa: S608
+
+            inserts = [row for value, row in keyed.items() if value not in existing]
+            updates = [row for value, row in keyed.items() if value in existing]
+            if "world" in columns:
+                for row in inserts:
+                    row.setdefault("world", self.server_name)
+
+            # Rows sharing the same columns are written with a single executemany
+            for row_columns, group in self._group_by_columns(inserts).items():
+                placeholders = ", ".join("?" * len(row_columns))
+                connection.executemany(
+                    f"INSERT INTO {table} ({', '.join(row_columns)}) VALUES ({placeholders})",  # noqa: S608
+                    [tuple(row[column] for column in row_columns) for row in group],
+                )
+            for row_columns, group in self._group_by_columns(updates).items():
+                assignments = ", ".join(f"{column} = ?" for column in row_columns if column != key)
+                if assignments:
+                    connection.executemany(
+                        f"UPDATE {table} SET {assignments} WHERE {key} = ?",  # noqa: S608
+                        [(*(row[column] for column in row_columns if column != key), row[key]) for row in group],
+                    )
+        return len(inserts), len(updates)
+
+    def _drop_plain_passwords(self, keyed: dict[str, dict]) -> dict[str, dict]:
+        """Drop the whitelist rows whose password is not a hash the server can check."""
+        accepted = {}
+        for value, row in keyed.items():
+            password = row.get("password")
+            if password and not PASSWORD_HASH_PATTERN.match(str(password)):
+                self.logger.error("Skipping whitelist row %r: plain password, import it with --rcon instead", value)
+                continue
+            accepted[value] = row
+        return accepted
+
+    @staticmethod
+    def _group_by_columns(rows: list[dict]) -> dict[tuple[str, ...], list[dict]]:
+        """Group rows by the set of columns they define."""
+        groups: dict[tuple[str, ...], list[dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        return groups
+
+    def delete_rows(self, table: str, rows: list[dict]) -> int:
+        """Delete the rows matching the indexed column of the given rows, in a single transaction.
+
+        Returns:
+            The amount of deleted rows.
+
+        """
+        key = TABLE_KEYS[table]
+        with closing(self._connect()) as connection, connection:
+            keyed = self._deduplicate(table, rows, self._columns(connection, table))
+            before = connection.total_changes
+            connection.executemany(f"DELETE FROM {table} WHERE {key} = ?", [(value,) for value in keyed])  # noqa: S608
+            return connection.total_changes - before
+
+    def export_rows(self, table: str, file: str) -> int:
+        """Export a table to a CSV or JSON file, read-only so the server may be running.
+
+        Returns:
+            The amount of exported rows.
+
+        """
+        with closing(self._connect(read_only=True)) as connection:
+            columns = self._columns(connection, table)
+            rows = connection.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid").fetchall()  # noqa: S608
+        write_rows(file, columns, rows)
+        return len(rows)
+
+
+def apply_over_rcon(logger: logging.Logger, env: dict, action: str, table: str, rows: list[dict]) -> bool:
+    """Apply an import or a deletion to the running server through RCON."""
+    key = TABLE_KEYS[table]
+    keyed = {str(row.get(key) or "").strip(): row for row in rows}
+    keyed.pop("", None)
+
+    commands = []
+    applied = 0
+    for value, row in keyed.items():
+        try:
+            translated = rcon_commands(table, {**row, key: value}, delete=action == "delete")
+        except ValueError as exc:
+            logger.warning("Row %r cannot be applied over RCON (%s), skipping", row, exc)
+            continue
+        if not translated:
+            logger.warning("Row %r cannot be applied over RCON, skipping", row)
+        commands += translated
+        applied += bool(translated)
+
+    if not commands:
+        return True
+    if RconClient.from_env(env, logger).run(commands) is None:
+        return False
+    logger.info("Sent %d command(s) over RCON for %d %s row(s)", len(commands), applied, table)
+    return True
+
+
+def main() -> None:
+    """Run the command line interface."""
+    logger = setup_logger()
+    env = load_custom_variables()
+
+    parser = argparse.ArgumentParser(description="Bulk management of the server whitelist, bans and access levels.")
+    parser.add_argument("--server", default=env.get("SERVER_NAME", "servertest"), help="server name")
+    parser.add_argument("--db", help="database file (default: ${CACHE_DIR}/db/<server>.db)")
+    parser.add_argument("--rcon", action="store_true", help="apply imports and deletions through RCON")
+    parser.add_argument("action", choices=("import", "export", "delete"))
+    parser.add_argument("table", choices=sorted(TABLE_KEYS))
+    parser.add_argument("file", help="CSV or JSON file")
+    args = parser.parse_args()
+
+    db_file = args.db or str(Path(env.get("CACHE_DIR", "/root/Zomboid")) / "db" / f"{args.server}.db")
+    database = ServerDatabase(logger, db_file, args.server)
+
+    try:
+        if args.action == "export":
+            count = database.export_rows(args.table, args.file)
+            logger.info("Exported %d %s row(s) to %s", count, args.table, args.file)
+            return
+
+        rows = read_rows(args.file)
+        if args.rcon:
+            sys.exit(0 if apply_over_rcon(logger, env, args.action, args.table, rows) else 1)
+        if database.is_held_by_server():
+            logger.error("%s is in use by the running server: stop it first or use --rcon", db_file)
+            sys.exit(1)
+
+        if args.action == "import":
+            inserted, updated = database.import_rows(args.table, rows)
+            logger.info("Imported %s: inserted:%d, updated:%d", args.table, inserted, updated)
+        else:
+            logger.info("Deleted %d %s row(s)", database.delete_rows(args.table, rows), args.table)
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        logger.error("%s of %s failed: %s", args.action.capitalize(), args.table, exc)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/bin/python3
+"""Declarative configuration of several Project Zomboid servers at once.
+
+A spec file (JSON; TOML needs Python 3.11+, which the image does not ship)
+describes the server instances
+sharing this installation. The Workshop set of every instance is resolved,
+downloaded and linked once; then each instance's `{name}.ini`,
+`{name}_SandboxVars.lua` and `{name}_spawnregions.lua` are rendered in parallel.
+
+Example spec (JSON):
+
+    {
+        "workshop_items": ["2169435993"],
+        "workshop_collections": [],
+        "mods": ["modoptions"],
+        "servers": {
+            "survival": {"ini": {"PVP": false}, "sandbox": {"Zombies": 2}},
+            "pvp": {"ini": {"PVP": true}, "preset": "Apocalypse", "workshop_items": ["2392709985"]}
+        }
+    }
+
+Top-level `workshop_items`, `workshop_collections` and `mods` are shared by
+every server; each server may add its own. List values may also be given as
+semicolon-separated strings, like their environment variable counterparts.
+`ini` overrides only apply to the INI file and `sandbox` overrides to the
+SandboxVars file.
+
+The container only launches the server named by `SERVER_NAME`; the other
+servers of the spec are configured for instances started separately.
+"""
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from boot_budget import BootBudget
+from defaults_index import DefaultsIndex
+from server_manager import ProjectZomboidServerManager
+from utils import load_custom_variables, log_section, setup_logger
+from workshop_manager import ProjectZomboidWorkshopManager
+
+SELECTION_KEYS = ("workshop_items", "workshop_collections", "mods")
+MAX_PARALLEL_RENDERS = 8
+
+
+def _as_list(value: object, field: str) -> list[str]:
+    """Normalize a list field given as a list or a semicolon-separated string."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(";")
+    if not isinstance(value, list):
+        msg = f"'{field}' must be a list or a semicolon-separated string"
+        raise TypeError(msg)
+    return list(dict.fromkeys(str(item).strip() for item in value if str(item).strip()))
+
+
+def _as_overrides(value: object, field: str) -> dict[str, str]:
+    """Normalize an overrides table into the string values used in config files."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        msg = f"'{field}' must be a table of key/value pairs"
+        raise TypeError(msg)
+    return {str(key): str(val).lower() if isinstance(val, bool) else str(val) for key, val in value.items()}
+
+
+def _normalize_server(name: str, server: object, shared: dict[str, list[str]]) -> dict:
+    """Normalize one server of the spec, merging the shared selection into its own."""
+    if not isinstance(server, dict):
+        msg = f"server '{name}' must be a table"
+        raise TypeError(msg)
+
+    normalized = {
+        "ini": _as_overrides(server.get("ini"), f"{name}.ini"),
+        "sandbox": _as_overrides(server.get("sandbox"), f"{name}.sandbox"),
+        "preset": server.get("preset"),
+    }
+    for key in SELECTION_KEYS:
+        normalized[key] = list(dict.fromkeys(shared[key] + _as_list(server.get(key), f"{name}.{key}")))
+    return normalized
+
+
+def load_spec(spec_file: str) -> dict:
+    """Load and normalize a multi-server spec file.
+
+    Args:
+        spec_file: Path to the JSON or TOML spec file.
+
+    Returns:
+        A dictionary with the shared `selection` (union of every server's
+        selection) and the normalized `servers`, keyed by server name.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file cannot be parsed or is not a valid spec.
+
+    """
+    content = Path(spec_file).read_text(encoding="utf-8")
+    if Path(spec_file).suffix == ".toml":
+        try:
+            import tomllib  # noqa: PLC0415 - only available on Python 3.11+
+        except ModuleNotFoundError as exc:
+            msg = "TOML spec files require Python 3.11+ (the image ships Python 3.10), use a JSON spec instead"
+            raise ValueError(msg) from exc
+        data = tomllib.loads(content)
+    else:
+        data = json.loads(content)
+
+    if not isinstance(data, dict) or not isinstance(data.get("servers"), dict) or not data["servers"]:
+        msg = "the spec must define at least one server under 'servers'"
+        raise ValueError(msg)
+
+    try:
+        shared = {key: _as_list(data.get(key), key) for key in SELECTION_KEYS}
+        servers = {name: _normalize_server(name, server, shared) for name, server in data["servers"].items()}
+    except TypeError as exc:
+        raise ValueError(str(exc)) from exc
+
+    selection = {
+        key: list(dict.fromkeys(value for server in servers.values() for value in server[key]))
+        for key in SELECTION_KEYS
+    }
+    return {"selection": selection, "servers": servers}
+
+
+class ProjectZomboidServerFleet:
+    """Generate the configuration of every server described in a spec file.
+
+    Responsibilities:
+        - Resolve, download and link the Workshop set shared by all servers once.
+        - Render the INI, SandboxVars and spawnregions of each server in parallel,
+          each with its own selection of items, mods, maps and overrides.
+
+    Attributes:
+        - spec: Normalized spec (see `load_spec`).
+        - env: Base environment mapping, overridden per server by the spec.
+        - index: Defaults index shared by every server.
+        - budget: Boot budget shared by the network steps.
+        - logger: Configured logger instance for informational messages.
+
+    """
+
+    def __init__(self, spec: dict, env: dict, index: DefaultsIndex, budget: BootBudget) -> None:
+        """Initialize the fleet from a normalized spec and the base environment."""
+        self.spec = spec
+        self.env = dict(env)
+        self.index = index
+        self.budget = budget
+        self.logger = setup_logger()
+
+    def apply_configuration(self) -> dict[str, tuple[str, str]]:
+        """Prepare the shared Workshop set, then configure every server in parallel.
+
+        Returns:
+            A mapping of server name to its (config_path, sandbox_path).
+
+        """
+        selection = self.spec["selection"]
+        launched = self.env.get("SERVER_NAME", "servertest")
+        if launched not in self.spec["servers"]:
+            self.logger.warning(
+                "SERVER_NAME=%s is not in the spec: the container launches it with a configuration the spec "
+                "does not describe",
+                launched,
+            )
+        log_section(self.logger, "Workshop management (shared)")
+        wk_manager = ProjectZomboidWorkshopManager(
+            self.env.get("SERVER_DIR", "/pzomboid-server"),
+            self.env.get("STEAM_WORKSHOP_DEFAULT_DIR", ""),
+            self.budget,
+            selection={
+                "workshop_items": selection["workshop_items"],
+                "mods": selection["mods"],
+                "collections": selection["workshop_collections"],
+            },
+        )
+        wk_manager.prepare_workshop_items()
+        self.budget.report()
+
+        log_section(self.logger, f"Server configuration ({len(self.spec['servers'])} servers)")
+        servers = self.spec["servers"]
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_RENDERS, len(servers))) as pool:
+            futures = {name: pool.submit(self._configure_server, wk_manager, name, servers[name]) for name in servers}
+
+        return {name: future.result() for name, future in futures.items()}
+
+    def _configure_server(
+        self,
+        wk_manager: ProjectZomboidWorkshopManager,
+        name: str,
+        server: dict,
+    ) -> tuple[str, str]:
+        """Render the configuration files of a single server."""
+        view = wk_manager.for_server(
+            name,
+            set(server["workshop_items"]),
+            set(server["workshop_collections"]),
+            server["mods"],
+        )
+        view.process_workshop_maps()
+
+        variables = dict(self.env)
+        variables["SERVER_NAME"] = name
+        variables["WORKSHOP_ITEMS"] = ";".join(sorted(view.server_workshop_items))
+        variables["MAP"] = view.get_maps_string()
+        variables["MODS"] = view.get_mods_string()
+        if server["preset"]:
+            variables["SERVER_PRESET"] = server["preset"]
+
+        # Spec overrides win over the computed values, like the MAP environment variable does,
+        # each only in the file of its own section
+        ini_overrides = self.index.check_overrides(server["ini"], scope="ini")
+        sandbox_overrides = self.index.check_overrides(server["sandbox"], scope="sandbox")
+
+        manager = ProjectZomboidServerManager(variables, self.index)
+        config_path, sandbox_path = manager.apply_configuration(ini_overrides, sandbox_overrides)
+        self.logger.info("Server %s configured", name)
+        return config_path, sandbox_path
+
+
+def main() -> None:
+    """Configure every server of the spec file given as argument (or SERVERS_SPEC_FILE)."""
+    logger = setup_logger()
+    variables = load_custom_variables()
+    spec_file = sys.argv[1] if len(sys.argv) > 1 else variables.get("SERVERS_SPEC_FILE")
+    if not spec_file:
+        logger.error("Usage: server_fleet.py <spec-file> (or set SERVERS_SPEC_FILE)")
+        sys.exit(1)
+
+    try:
+        spec = load_spec(spec_file)
+    except (OSError, ValueError) as exc:
+        logger.error("Invalid servers spec %s: %s", spec_file, exc)
+        sys.exit(1)
+
+    index = DefaultsIndex.load(variables.get("DEFAULTS_DIR", "/defaults"), logger)
+    budget = BootBudget.from_env(variables, logger)
+    ProjectZomboidServerFleet(spec, variables, index, budget).apply_configuration()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,54 @@
+#!/bin/python3
 """Server configuration manager for Project Zomboid.
 
 Provides a class-based API to validate/create server config files (INI and
 SandboxVars) and to replace variables in those files based on an environment
 mapping. Mirrors the style and responsibilities of the workshop manager.
+
+Run directly, it applies INI changes to a running server:
+
+    server_manager.py PVP=false SaveWorldEveryMinutes=15
 """
 
 import re
+import sys
 from pathlib import Path
 
+from defaults_index import DefaultsIndex, render_sandbox
+from rcon_client import RconClient
 from utils import (
     REGEX,
     convert_to_flatcase,
     is_line_valid,
+    load_custom_variables,
     log_rule,
     setup_logger,
 )
 
+# INI keys read only when the server starts: `reloadoptions` does not apply them
+RESTART_REQUIRED_KEYS = frozenset(
+    convert_to_flatcase(key)
+    for key in (
+        "DefaultPort",
+        "UDPPort",
+        "SteamPort1",
+        "SteamPort2",
+        "SteamVAC",
+        "UPnP",
+        "RCONPort",
+        "RCONPassword",
+        "MaxPlayers",
+        "Public",
+        "Mods",
+        "WorkshopItems",
+        "Map",
+        "SpawnRegions",
+        "ServerPlayerID",
+        "ResetID",
+        "DoLuaChecksum",
+    )
+)
+
 
 class ProjectZomboidServerManager:
     """Manage Project Zomboid server configuration files and replacements.
@@ -25,18 +58,21 @@ class ProjectZomboidServerManager:
         - Validate or create the SandboxVars.lua using defaults or presets.
         - Optionally force a preset even when a sandbox file already exists.
         - Replace variables in configuration files using values from the environment.
+        - Apply INI changes to a running server, reloading them over RCON when possible.
 
     Attributes:
         - env: Mapping of configuration/environment variables used by the manager.
         - logger: Configured logger instance for informational messages.
+        - index: Precompiled index of the defaults and presets the files are created from.
 
     """
 
-    def __init__(self, env: dict) -> None:
+    def __init__(self, env: dict, index: DefaultsIndex | None = None) -> None:
         """Initialize the server manager with an environment mapping.
 
         Extracts commonly used values to attributes to avoid passing them
-        around repeatedly.
+        around repeatedly. The defaults index is loaded from DEFAULTS_DIR
+        unless one is provided.
         """
         self.env = dict(env)
         self.logger = setup_logger()
@@ -46,30 +82,26 @@ class ProjectZomboidServerManager:
         self.presets_dir = self.env.get("PRESETS_DIR", "")
         self.selected_preset = self.env.get("SERVER_PRESET")
         self.force_preset = self.env.get("FORCE_PRESET", "0") == "1"
+        self.index = index or DefaultsIndex.load(self.defaults_dir, self.logger)
 
     def validate_config_file(self) -> str:
         """Ensure the server INI file exists and return its path.
 
         Behavior:
             - Builds the path as {CACHE_DIR}/Server/{server_name}.ini (/root/Zomboid by default).
-            - If missing, copies {DEFAULTS_DIR}/default.ini (/defaults by default) to that path.
+            - If missing, writes the default INI (from the defaults index) to that path.
 
         Returns:
             The full path to the server's .ini file.
 
         """
-        default_file = f"{self.defaults_dir}/default.ini"
         config_file = f"{self.cache_dir}/Server/{self.server_name}.ini"
         self.logger.info("Validating config file for server: %s", self.server_name)
 
         if not Path(config_file).exists():
             self.logger.info("Config file missing, creating from default")
-            default_path = Path(default_file)
             Path(config_file).parent.mkdir(parents=True, exist_ok=True)
-            Path(config_file).write_text(
-                default_path.read_text(encoding="utf-8"),
-                encoding="utf-8",
-            )
+            Path(config_file).write_text(self.index.ini_content, encoding="utf-8")
         else:
             self.logger.info("Config file exists, using it as is")
 
@@ -80,12 +112,13 @@ class ProjectZomboidServerManager:
         """Validate or create the server SandboxVars.lua and return its path.
 
         Selection logic:
-            - If SERVER_PRESET is set and the file exists in PRESETS_DIR, it's used as source.
+            - If SERVER_PRESET is set and the preset exists in PRESETS_DIR, it's used as source.
             - If sandbox already exists, it's used as the base; when FORCE_PRESET=1, the preset overrides it.
-            - Otherwise, uses {DEFAULTS_DIR}/default_SandboxVars.lua.
+            - Otherwise, uses the default SandboxVars.
 
-        The selected content is normalized by replacing a leading "return" with "SandboxVars =" and is
-        written to {CACHE_DIR}/Server/{server_name}_SandboxVars.lua.
+        Presets and defaults are served already rendered from the defaults index. The
+        existing file is normalized by replacing a leading "return" with "SandboxVars =".
+        The result is written to {CACHE_DIR}/Server/{server_name}_SandboxVars.lua.
 
         Returns:
             The full path to the resulting SandboxVars.lua.
@@ -94,64 +127,62 @@ class ProjectZomboidServerManager:
             OSError: If reading from or writing to files fails.
 
         """
-        default_file = f"{self.defaults_dir}/default_SandboxVars.lua"
         sandbox_file = f"{self.cache_dir}/Server/{self.server_name}_SandboxVars.lua"
 
-        preset_file = (
-            f"{self.presets_dir}/{self.selected_preset}.lua"
+        preset_content = (
+            self.index.get_preset(self.presets_dir, self.selected_preset)
             if self.selected_preset
             else None
         )
         log_rule(self.logger)
         self.logger.info("Validating SandboxVars for server: %s", self.server_name)
-        if preset_file and not Path(preset_file).exists():
-            preset_file = None
+        if self.selected_preset and preset_content is None:
             self.logger.warning(
                 'Preset "%s" doesn\'t exist, skipping', self.selected_preset,
             )
 
         if not Path(sandbox_file).exists():
             self.logger.info(
-                'SandboxVars file missing, creating from "%s"', preset_file or "default",
+                'SandboxVars file missing, creating from "%s"',
+                self.selected_preset if preset_content is not None else "default",
             )
-            default_path = Path(preset_file) if preset_file else Path(default_file)
+            default_content = preset_content if preset_content is not None else self.index.sandbox_content
         else:
             self.logger.info(
                 "SandboxVars file exists, using it as base %s",
                 " (forcing preset)" if self.force_preset else "",
             )
-            default_path = Path(sandbox_file)
-            if preset_file and self.force_preset:
+            default_content = render_sandbox(Path(sandbox_file).read_text(encoding="utf-8"))
+            if preset_content is not None and self.force_preset:
                 self.logger.info('Forcing preset "%s"', self.selected_preset)
-                default_path = Path(preset_file)
+                default_content = preset_content
 
-        default_content = default_path.read_text(encoding="utf-8").replace(
-            "return",
-            "SandboxVars =",
-        )
         Path(sandbox_file).parent.mkdir(parents=True, exist_ok=True)
         Path(sandbox_file).write_text(default_content, encoding="utf-8")
 
         log_rule(self.logger)
         return sandbox_file
 
-    def replace_file_variables(self, file_path: str) -> None:
+    def replace_file_variables(self, file_path: str, variables: dict | None = None) -> list[str]:
         """Replace variables in a config file with values from a mapping.
 
         Matching is case-insensitive and ignores separators (snake/kebab/camel).
         Only variables present in the mapping are updated. Lines that are empty,
-        comments, or contain curly braces are ignored.
+        comments, or contain curly braces are ignored. The file is replaced
+        atomically, so a running server never reads it half-written.
 
         Args:
             file_path: Path to the configuration file to modify in-place.
+            variables: Mapping to take the values from (defaults to the environment).
 
         Returns:
-            None. The file is modified in-place.
+            The keys whose value changed, as spelled in the file.
 
         """
         logger = self.logger
-        updated_lines = 0
-        flat_variables_dict = {convert_to_flatcase(k): v for k, v in self.env.items()}
+        updated_keys = []
+        mapping = self.env if variables is None else variables
+        flat_variables_dict = {convert_to_flatcase(k): v for k, v in mapping.items()}
 
         logger.info("Replacing variables in file: %s", Path(file_path).name)
         with Path(file_path).open(encoding="utf-8") as file:
@@ -182,22 +213,33 @@ class ProjectZomboidServerManager:
                         old_value,
                         new_value,
                     )
-                    updated_lines += 1
+                    updated_keys.append(key)
                     new_lines.append(updated_line)
                 else:
                     new_lines.append(line)
             else:
                 new_lines.append(line)
 
-        with Path(file_path).open("w", encoding="utf-8") as file:
+        temporary = Path(file_path).with_name(f".{Path(file_path).name}.tmp")
+        with temporary.open("w", encoding="utf-8") as file:
             file.writelines(new_lines)
+        temporary.replace(file_path)
 
-        logger.info("Total lines updated: %d", updated_lines)
+        logger.info("Total lines updated: %d", len(updated_keys))
         log_rule(self.logger)
+        return updated_keys
 
-    def apply_configuration(self) -> tuple[str, str]:
+    def apply_configuration(
+        self,
+        ini_overrides: dict | None = None,
+        sandbox_overrides: dict | None = None,
+    ) -> tuple[str, str]:
         """Validate/create INI and SandboxVars, then apply replacements to both.
 
+        Args:
+            ini_overrides: Values applied on top of the environment to the INI file only.
+            sandbox_overrides: Values applied on top of the environment to the SandboxVars file only.
+
         Returns:
             A tuple (config_path, sandbox_path) of the updated files.
 
@@ -205,9 +247,67 @@ class ProjectZomboidServerManager:
         sandbox_path = self.validate_sandbox_file()
         config_path = self.validate_config_file()
 
-        self.replace_file_variables(config_path)
-        self.replace_file_variables(sandbox_path)
+        self.replace_file_variables(config_path, {**self.env, **(ini_overrides or {})})
+        self.replace_file_variables(sandbox_path, {**self.env, **(sandbox_overrides or {})})
 
         self.logger.info("Configuration applied successfully.")
         log_rule(self.logger)
         return config_path, sandbox_path
+
+    def apply_live(self, overrides: dict, rcon: RconClient | None = None) -> tuple[list[str], list[str]]:
+        """Apply INI overrides while the server keeps running.
+
+        The INI file is rewritten with the overrides only (not the whole
+        environment). Each changed key is then classified: reloadable keys take
+        effect right away through the `reloadoptions` console command, while
+        the keys in `RESTART_REQUIRED_KEYS` are only reported, as they apply at
+        the next restart.
+
+        Args:
+            overrides: Mapping of INI keys (any case/separator style) to their new value.
+            rcon: RCON client to reach the server (built from the environment when omitted).
+
+        Returns:
+            A tuple (reloadable, restart_required) of the changed keys.
+
+        """
+        config_path = self.validate_config_file()
+        changed = self.replace_file_variables(config_path, overrides)
+        reloadable = [key for key in changed if convert_to_flatcase(key) not in RESTART_REQUIRED_KEYS]
+        restart_required = [key for key in changed if convert_to_flatcase(key) in RESTART_REQUIRED_KEYS]
+
+        if not changed:
+            self.logger.info("No INI changes to apply")
+        elif reloadable:
+            rcon = rcon or RconClient.from_env(self.env, self.logger)
+            if rcon.run(["reloadoptions"]) is None:
+                self.logger.error("Could not reload the options, they will apply at the next restart")
+            else:
+                self.logger.info("Reloaded on the running server: %s", ", ".join(reloadable))
+
+        if restart_required:
+            self.logger.warning("Written, but only applied at the next restart: %s", ", ".join(restart_required))
+        return reloadable, restart_required
+
+
+def main() -> None:
+    """Apply the KEY=VALUE INI overrides given as arguments to the running server."""
+    logger = setup_logger()
+    variables = load_custom_variables()
+    pairs = [argument.partition("=") for argument in sys.argv[1:]]
+    if not pairs or any(not key or not separator for key, separator, _ in pairs):
+        logger.error("Usage: server_manager.py KEY=VALUE [KEY=VALUE ...]")
+        sys.exit(1)
+
+    index = DefaultsIndex.load(variables.get("DEFAULTS_DIR", "/defaults"), logger)
+    ini_keys = index.data["ini"]["keys"]
+    overrides = index.check_overrides({key: value for key, _, value in pairs})
+    for key in [key for key in overrides if convert_to_flatcase(key) not in ini_keys]:
+        logger.error("%s is not an INI setting, skipping", key)
+        overrides.pop(key)
+
+    ProjectZomboidServerManager(variables, index).apply_live(overrides)
+
+
+if __name__ == "__main__":
+    main()
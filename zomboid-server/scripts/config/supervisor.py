@@ -0,0 +1,245 @@
+#!/bin/python3
+"""Supervise the dedicated server as a child process.
+
+Started by the entrypoint instead of `exec`ing the server when `SUPERVISOR=1`,
+once the Workshop and configuration stages are done. The server start script
+runs as a child in its own process group, and this process stays PID 1:
+
+- On SIGTERM or SIGINT (`docker stop`), the server is asked to `quit` over
+  RCON, which saves the world. If it is still running after
+  `SUPERVISOR_STOP_TIMEOUT` seconds (also when RCON could not be reached), its
+  process group is terminated, then killed.
+- When the server exits with an error or a signal, it is started again with an
+  exponential backoff, without repeating the configuration stages. A server
+  that ran long enough resets the backoff. A clean exit (e.g. `quit` from the
+  admin console) stops the supervisor too.
+- With `LOG_ROTATION=1`, the log rotation worker runs as another child for the
+  lifetime of the supervisor, and is stopped (SIGTERM, then SIGKILL) with it.
+
+Usage:
+
+    supervisor.py /scripts/init-server.sh
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rcon_client import RconClient
+from utils import load_custom_variables, setup_logger
+
+if TYPE_CHECKING:
+    import logging
+
+DEFAULT_SETTINGS = {
+    "SUPERVISOR_STOP_TIMEOUT": 60,
+    "SUPERVISOR_RESTART_DELAY": 5,
+    "SUPERVISOR_MAX_RESTART_DELAY": 300,
+}
+# Seconds a server must run for a crash to be treated as a new one (resets the backoff)
+STABLE_UPTIME_SECONDS = 600
+# Seconds left to the process group between SIGTERM and SIGKILL
+KILL_GRACE_SECONDS = 10
+POLL_INTERVAL_SECONDS = 1
+LOG_ROTATION_SCRIPT = Path(__file__).with_name("log_rotation.py")
+
+
+class ServerSupervisor:
+    """Run the server as a child process, stopping it gracefully and restarting it on crashes.
+
+    Attributes:
+        - logger: Logger used to report the server lifecycle.
+        - command: Command starting the server (the init script and its arguments).
+        - rcon: RCON client used to quit the server.
+        - stop_timeout: Seconds the server is given to quit once asked to.
+        - restart_delay: Delay before the first restart after a crash, doubled on each consecutive crash.
+        - max_restart_delay: Upper bound of the restart delay.
+        - log_rotation: Whether to run the log rotation worker alongside the server.
+        - stop_requested: Set when the supervisor is asked to stop.
+
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        command: list[str],
+        rcon: RconClient,
+        settings: dict[str, int] | None = None,
+        *,
+        log_rotation: bool = False,
+    ) -> None:
+        """Initialize the supervisor.
+
+        Args:
+            logger: Logger used to report the server lifecycle.
+            command: Command starting the server.
+            rcon: RCON client used to quit the server.
+            settings: Overrides of `DEFAULT_SETTINGS`.
+            log_rotation: Whether to run the log rotation worker alongside the server.
+
+        """
+        settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.logger = logger
+        self.command = command
+        self.rcon = rcon
+        self.stop_timeout = settings["SUPERVISOR_STOP_TIMEOUT"]
+        self.restart_delay = settings["SUPERVISOR_RESTART_DELAY"]
+        self.max_restart_delay = settings["SUPERVISOR_MAX_RESTART_DELAY"]
+        self.log_rotation = log_rotation
+        self.stop_requested = threading.Event()
+
+    @classmethod
+    def from_env(cls, env: dict, logger: logging.Logger, command: list[str]) -> ServerSupervisor:
+        """Create a supervisor from the `SUPERVISOR_*`, `RCON_*` and `LOG_ROTATION` variables.
+
+        Invalid values are reported and replaced by their defaults.
+        """
+        settings = dict(DEFAULT_SETTINGS)
+        for name, default in DEFAULT_SETTINGS.items():
+            raw = (env.get(name) or "").strip()
+            if not raw:
+                continue
+            if raw.isdigit():
+                settings[name] = int(raw)
+            else:
+                logger.warning("Invalid %s=%r, using %d", name, raw, default)
+
+        log_rotation = (env.get("LOG_ROTATION") or "").strip().lower() in {"1", "true"}
+        return cls(logger, command, RconClient.from_env(env, logger), settings, log_rotation=log_rotation)
+
+    def request_stop(self, signum: int, _frame: object = None) -> None:
+        """Signal handler asking the supervisor to stop the server."""
+        if not self.stop_requested.is_set():
+            self.logger.info("Received %s, stopping the server", signal.Signals(signum).name)
+        self.stop_requested.set()
+
+    def _start(self) -> subprocess.Popen:
+        """Start the server in its own process group, sharing the supervisor's stdio."""
+        self.logger.info("Starting the server: %s", " ".join(self.command))
+        return subprocess.Popen(self.command, start_new_session=True)  # noqa: S603
+
+    def _wait(self, process: subprocess.Popen, timeout: float) -> int | None:
+        """Wait for the server to exit, returning its exit code or None on timeout."""
+        try:
+            return process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None
+
+    def _signal_group(self, process: subprocess.Popen, signum: int) -> None:
+        """Send a signal to the process group of the server."""
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signum)
+
+    def stop(self, process: subprocess.Popen) -> int:
+        """Quit the server over RCON (which saves the world), terminating then killing it past the timeout.
+
+        The whole `stop_timeout` is given to the server to exit, even when RCON
+        could not be reached, so a save in progress is never interrupted early.
+
+        Returns:
+            The exit code of the server.
+
+        """
+        deadline = time.monotonic() + self.stop_timeout
+        if self.rcon.run(["quit"], timeout=self.stop_timeout) is None:
+            self.logger.warning("Could not send quit over RCON, waiting for the server to exit")
+
+        returncode = self._wait(process, max(deadline - time.monotonic(), 0))
+        if returncode is None:
+            self.logger.warning("Server still running after %ds, terminating it", self.stop_timeout)
+            self._signal_group(process, signal.SIGTERM)
+            returncode = self._wait(process, KILL_GRACE_SECONDS)
+        if returncode is None:
+            self.logger.error("Server ignored SIGTERM, killing it")
+            self._signal_group(process, signal.SIGKILL)
+            returncode = process.wait()
+
+        self.logger.info("Server stopped (exit code %d)", returncode)
+        return returncode
+
+    def _start_log_rotation(self) -> subprocess.Popen | None:
+        """Start the log rotation worker in its own process group, or return None if it cannot start."""
+        try:
+            return subprocess.Popen(  # noqa: S603
+                [sys.executable, str(LOG_ROTATION_SCRIPT), "--watch"],
+                start_new_session=True,
+            )
+        except OSError as exc:
+            self.logger.error("Failed to start the log rotation worker: %s", exc)
+            return None
+
+    def _stop_log_rotation(self, process: subprocess.Popen) -> None:
+        """Stop the log rotation worker, killing it if it does not stop in time."""
+        self._signal_group(process, signal.SIGTERM)
+        if self._wait(process, KILL_GRACE_SECONDS) is None:
+            self.logger.warning("Log rotation worker still running after %ds, killing it", KILL_GRACE_SECONDS)
+            self._signal_group(process, signal.SIGKILL)
+            process.wait()
+
+    def run(self) -> int:
+        """Run the server (and the log rotation worker) until it exits cleanly or the supervisor is asked to stop.
+
+        Returns:
+            The exit code of the supervisor.
+
+        """
+        worker = self._start_log_rotation() if self.log_rotation else None
+        try:
+            return self._supervise()
+        finally:
+            if worker is not None:
+                self._stop_log_rotation(worker)
+
+    def _supervise(self) -> int:
+        """Run the server, restarting it on crashes, until it exits cleanly or a stop is requested."""
+        delay = self.restart_delay
+        while not self.stop_requested.is_set():
+            started_at = time.monotonic()
+            try:
+                process = self._start()
+            except OSError as exc:
+                self.logger.error("Failed to start the server: %s", exc)
+                return 1
+
+            returncode = None
+            while returncode is None and not self.stop_requested.wait(POLL_INTERVAL_SECONDS):
+                returncode = process.poll()
+            if returncode is None:
+                self.stop(process)
+                return 0
+            if returncode == 0:
+                self.logger.info("Server exited cleanly, stopping the supervisor")
+                return 0
+
+            if time.monotonic() - started_at >= STABLE_UPTIME_SECONDS:
+                delay = self.restart_delay
+            self.logger.error("Server exited with code %d, restarting it in %ds", returncode, delay)
+            if self.stop_requested.wait(delay):
+                break
+            delay = min(delay * 2, self.max_restart_delay)
+        return 0
+
+
+def main() -> None:
+    """Supervise the server command given as arguments."""
+    logger = setup_logger()
+    if len(sys.argv) < 2:  # noqa: PLR2004
+        logger.error("Usage: %s <server command> [args...]", sys.argv[0])
+        sys.exit(2)
+
+    supervisor = ServerSupervisor.from_env(load_custom_variables(), logger, sys.argv[1:])
+    signal.signal(signal.SIGTERM, supervisor.request_stop)
+    signal.signal(signal.SIGINT, supervisor.request_stop)
+    sys.exit(supervisor.run())
+
+
+if __name__ == "__main__":
+    main()
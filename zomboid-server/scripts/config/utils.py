@@ -5,6 +5,9 @@ import shutil
 import sys
 from pathlib import Path
 
+# Prefix of the temporary links created while swapping a symlink atomically
+SYMLINK_TMP_PREFIX = ".tmp-link-"
+
 REGEX = re.compile(
     r"^(.*?)(\b\w+\b)(\s*=\s*)(\"(?:[^\"\\\\]|\\\\.)*\"|'(?:[^'\\\\]|\\\\.)*'|.*?)(?=\s*,?\s*(?:#.*)?$)(\s*,?\s*(?:#.*)?)$",
 )
@@ -107,9 +110,34 @@ def convert_to_flatcase(text: str) -> str:
     return re.sub(r"[-_\s]", "", text)
 
 
+def swap_symlink(source: Path, target: Path) -> None:
+    """Atomically point the symbolic link ``target`` at ``source``.
+
+    The new link is created under a temporary name next to ``target`` and renamed
+    over it, so ``target`` is never missing, even if the process dies halfway.
+    ``target`` must not be a real directory.
+
+    Args:
+        source (Path): The path the link must point to.
+        target (Path): The link path to create/update.
+
+    Raises:
+        OSError: If the temporary link cannot be created or renamed.
+
+    """
+    temporary = target.with_name(f"{SYMLINK_TMP_PREFIX}{target.name}")
+    if temporary.is_symlink() or temporary.exists():
+        temporary.unlink()
+    temporary.symlink_to(source)
+    temporary.replace(target)
+
+
 def generate_symlink(source: Path, target: Path) -> bool:
     """Create or update a symbolic link from ``target`` pointing to ``source``.
 
+    Existing links are swapped atomically (see ``swap_symlink``); real files or
+    directories found at ``target`` are removed first.
+
     Args:
         source (Path): The source path (usually an existing directory).
         target (Path): The link path to create/update.
@@ -123,19 +151,41 @@ def generate_symlink(source: Path, target: Path) -> bool:
         target.parent.mkdir(parents=True, exist_ok=True)
 
         if target.is_symlink():
-            current = target.readlink()
-            if str(current) != str(source):
-                target.unlink()
-                target.symlink_to(source)
+            if str(target.readlink()) == str(source):
+                return True
+        elif target.is_dir():
+            shutil.rmtree(target)
         elif target.exists():
-            if target.is_dir():
-                shutil.rmtree(target)
-            else:
-                target.unlink()
-            target.symlink_to(source)
-        else:
-            target.symlink_to(source)
+            target.unlink()
+
+        swap_symlink(source, target)
     except OSError:
         return False
 
     return True
+
+
+def get_open_files() -> set[Path]:
+    """Return the files held open by the other processes, read from ``/proc/<pid>/fd``.
+
+    Processes whose descriptors cannot be listed (gone, or not permitted) are skipped.
+
+    Returns:
+        set[Path]: The paths of the open files.
+
+    """
+    own_pid = str(os.getpid())
+    open_files = set()
+    for fd_folder in Path("/proc").glob("[0-9]*/fd"):
+        if fd_folder.parent.name == own_pid:
+            continue
+        try:
+            descriptors = list(fd_folder.iterdir())
+        except OSError:
+            continue
+        for descriptor in descriptors:
+            try:
+                open_files.add(descriptor.readlink())
+            except OSError:
+                continue
+    return open_files
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from workshop_seed import parse_vdf
+
+if TYPE_CHECKING:
+    import logging
+
+INTEGRITY_CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_HASH_WORKERS = 8
+
+
+def hash_file(path: Path) -> str:
+    """Hash the content of a file (BLAKE2b, 128 bits)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as stream:
+        while chunk := stream.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_files(folder: Path) -> dict[str, tuple[int, int]]:
+    """Return the size and modification time (ns) of every file under a folder, keyed by relative path."""
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = Path(root) / name
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files[str(path.relative_to(folder))] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class WorkshopIntegrity:
+    """Verify downloaded Workshop items against their manifest and cached content hashes.
+
+    An item is damaged when the Workshop manifest has no entry for it, or when
+    its files add up to less than the size recorded there (an interrupted
+    download). With content hashing enabled, an item is also damaged when a
+    file hashed on a previous boot is missing, or when a file changed on disk
+    while the item was not updated and its content no longer matches the
+    cached hash. Only items that passed the manifest checks get a hash
+    baseline. Files whose size and modification time are unchanged are
+    trusted without being hashed again; the others are hashed on a thread
+    pool. The hashes are cached next to the manifest, per item version
+    (`timeupdated`).
+
+    Attributes:
+        - logger: Logger used to report damaged items.
+        - steam_workshop_folder: Workshop folder holding the items and the manifest.
+        - game_app_id: Steam App ID of the game the items belong to.
+        - hash_files: Whether content hashes are checked and cached, on top of the manifest checks.
+        - cache_file: JSON file holding the cached hashes.
+
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        steam_workshop_folder: str,
+        game_app_id: str,
+        *,
+        hash_files: bool = False,
+    ) -> None:
+        """Initialize the verifier of a Workshop folder."""
+        self.logger = logger
+        self.game_app_id = game_app_id
+        self.hash_files = hash_files
+        self.steam_workshop_folder = Path(steam_workshop_folder)
+        self.cache_file = self.steam_workshop_folder / f"integrity_{game_app_id}.json"
+
+    def _load_manifest(self) -> dict[str, dict] | None:
+        """Return the installed items of the manifest, or None when there is no manifest."""
+        try:
+            manifest_file = self.steam_workshop_folder / f"appworkshop_{self.game_app_id}.acf"
+            manifest = parse_vdf(manifest_file.read_text(encoding="utf-8"))
+        except OSError:
+            return None
+        return manifest.get("AppWorkshop", {}).get("WorkshopItemsInstalled", {})
+
+    def _load_cache(self) -> dict[str, dict]:
+        """Load the cached hashes of each item."""
+        try:
+            cache = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or cache.get("version") != INTEGRITY_CACHE_VERSION:
+            return {}
+        return cache.get("items", {})
+
+    def _save_cache(self, items: dict[str, dict]) -> None:
+        """Persist the hashes of the verified items."""
+        temporary = self.cache_file.with_name(f".{self.cache_file.name}.tmp")
+        try:
+            temporary.write_text(json.dumps({"version": INTEGRITY_CACHE_VERSION, "items": items}), encoding="utf-8")
+            temporary.replace(self.cache_file)
+        except OSError as exc:
+            self.logger.warning("Could not cache the workshop content hashes: %s", exc)
+
+    def _check_item(
+        self,
+        wid: str,
+        files: dict[str, tuple[int, int]],
+        entry: dict | None,
+        cached: dict | None,
+    ) -> tuple[str | None, list[str]]:
+        """Check an item without hashing, returning the reason it is damaged and the files to hash."""
+        if entry is None:
+            return "no entry in the workshop manifest", []
+        expected = int(entry.get("size") or 0) if str(entry.get("size") or "0").isdigit() else 0
+        actual = sum(size for size, _ in files.values())
+        if actual < expected:
+            return f"{actual} of {expected} bytes on disk", []
+
+        if not self.hash_files:
+            return None, []
+        if cached is None:
+            return None, list(files)
+
+        missing = sorted(set(cached["files"]) - set(files))
+        if missing:
+            return f"{len(missing)} file(s) missing, e.g. {missing[0]}", []
+
+        known = cached["files"]
+        to_hash = [rel for rel, (size, mtime) in files.items() if rel not in known or known[rel][:2] != [size, mtime]]
+        if to_hash:
+            self.logger.info("Workshop item %s: %d changed file(s) to hash", wid, len(to_hash))
+        return None, to_hash
+
+    def verify(self, workshop_items: set[str]) -> set[str]:
+        """Verify the downloaded items among the given ones.
+
+        Args:
+            workshop_items: Workshop IDs to verify (items not on disk are ignored).
+
+        Returns:
+            The Workshop IDs of the damaged items.
+
+        """
+        content = self.steam_workshop_folder / "content" / self.game_app_id
+        manifest = self._load_manifest()
+        if manifest is None:
+            self.logger.warning("No workshop manifest, the downloaded workshop items cannot be verified")
+            return set()
+        cache = self._load_cache() if self.hash_files else {}
+        damaged: set[str] = set()
+        results: dict[str, dict] = {}
+        # (item, relative path, cached hash to match or "" for a new baseline)
+        jobs: list[tuple[str, str, str]] = []
+
+        for wid in sorted(item for item in workshop_items if (content / item).is_dir()):
+            files = scan_files(content / wid)
+            entry = manifest.get(wid)
+            version = (entry or {}).get("timeupdated", "")
+            cached = cache.get(wid) if cache.get(wid, {}).get("timeupdated") == version else None
+
+            reason, to_hash = self._check_item(wid, files, entry, cached)
+            if reason:
+                self.logger.warning("Workshop item %s is damaged: %s", wid, reason)
+                damaged.add(wid)
+                continue
+
+            known = cached["files"] if cached else {}
+            results[wid] = {
+                "timeupdated": version,
+                "files": {rel: [*files[rel], known.get(rel, [0, 0, ""])[2]] for rel in files},
+            }
+            jobs += [(wid, rel, known.get(rel, [0, 0, ""])[2]) for rel in to_hash]
+
+        with ThreadPoolExecutor(max_workers=min(MAX_HASH_WORKERS, os.cpu_count() or 1)) as pool:
+            hashes = list(pool.map(lambda job: self._hash(content / job[0] / job[1]), jobs))
+
+        for (wid, rel, expected), digest in zip(jobs, hashes, strict=True):
+            if wid in damaged:
+                continue
+            if digest is None or (expected and digest != expected):
+                self.logger.warning("Workshop item %s is damaged: %s does not match its cached hash", wid, rel)
+                damaged.add(wid)
+                continue
+            results[wid]["files"][rel][2] = digest
+
+        if self.hash_files:
+            self._save_cache({wid: result for wid, result in results.items() if wid not in damaged})
+        self.logger.info(
+            "Verified %d workshop item(s), hashed %d file(s), damaged:%d",
+            len(results),
+            len(hashes),
+            len(damaged),
+        )
+        return damaged
+
+    def _hash(self, path: Path) -> str | None:
+        """Hash a file, returning None when it cannot be read."""
+        try:
+            return hash_file(path)
+        except OSError as exc:
+            self.logger.error("Could not read %s: %s", path, exc)
+            return None
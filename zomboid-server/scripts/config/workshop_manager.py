@@ -1,12 +1,24 @@
+import contextlib
+import copy
+import json
 import os
 import re
 import shutil
+import signal
 import subprocess
 from pathlib import Path
 
+from boot_budget import BootBudget
 from collection_resolver import SteamCollectionResolver
-from utils import generate_symlink, setup_logger
+from map_index import MapCellIndex
+from mod_catalog import ModCatalog
+from utils import SYMLINK_TMP_PREFIX, generate_symlink, setup_logger, swap_symlink
+from workshop_integrity import WorkshopIntegrity
+from workshop_seed import WorkshopSeed
+from workshop_staging import WorkshopStaging
 
+# Damaged items are moved aside under this prefix until a fresh copy is downloaded
+DAMAGED_ITEM_PREFIX = ".damaged-"
 
 class ProjectZomboidWorkshopManager:
     """Manage Project Zomboid Steam Workshop mods for a dedicated server.
@@ -15,18 +27,28 @@ class ProjectZomboidWorkshopManager:
         - Read the selected Workshop item IDs (mods) from environment.
         - Expand the selected Workshop collections into items and mods via the Steam Web API.
         - Detect which selected items are already downloaded in the Steam Workshop folder.
+        - Seed missing items from the Workshop content pre-baked into the image.
+        - Verify downloaded items against their manifest and cached hashes, re-downloading damaged ones.
+        - Promote the item updates staged while the server was running.
         - Download missing items (one-by-one) via `steamcmd`.
         - Synchronize symlinks under the server's workshop directory to point at downloaded items.
+        - Catalog the mods of the linked items to derive the mod load order from their requirements.
+        - Index the cells of the discovered maps to report overlaps and order them by their declared lots.
 
     Attributes:
         - server_app_id: Steam App ID for the dedicated server (default: 380870).
         - game_app_id: Steam App ID for the Zomboid game (default: 108600).
         - success_re: Regex to detect successful download messages from `steamcmd`.
         - error_re: Regex to detect error messages from `steamcmd`.
+        - network_error_re: Regex to detect the `steamcmd` errors caused by the connection or the login,
+          the only ones counted by the circuit breaker.
         - server_folder: Root folder of the dedicated server.
         - steam_workshop_folder: Resolved path to the Steam Workshop content for Zomboid.
         - server_workshop_folder: Resolved path to the server's workshop symlink directory.
         - server_workshop_items: Set of selected Workshop IDs (strings) from environment.
+        - mod_catalog: Catalog of the mods found in the linked items (built by `process_workshop_items`).
+        - budget: Boot budget and circuit breaker shared by the network steps.
+        - map_index: Cell index of the discovered maps (built by `process_workshop_maps`).
 
     """
 
@@ -37,28 +59,64 @@ class ProjectZomboidWorkshopManager:
     defaults_dir = os.getenv("DEFAULTS_DIR", "/defaults")
     server_name = os.getenv("SERVER_NAME", "servertest")
 
+    # Read-only Workshop content pre-baked at build time (PREBAKE_* build args)
+    seed_dir = os.getenv("WORKSHOP_SEED_DIR", "/workshop-seed")
+    # "0" disables verification, "1" checks the manifest, "hash" also checks content hashes
+    verify_mode = os.getenv("WORKSHOP_VERIFY", "1").strip().lower()
+
+    # Last successful collection resolution, used when Steam can't be reached
+    collections_cache_file = Path(cache_dir) / "workshop_collections.json"
+
     success_re = re.compile(r"Success.*item\s+(\d+)", re.IGNORECASE)
     error_re = re.compile(r"ERROR!.*item\s+(\d+)", re.IGNORECASE)
-
-    def __init__(self, server_folder: str, steam_workshop_folder: str) -> None:
+    # Errors of an item itself (removed, private, "Failure") say nothing about the network
+    network_error_re = re.compile(
+        r"FAILED.*login|Login Failure|No Connection|Connection (?:failed|refused|timed out)|"
+        r"\((?:Timeout|Service Unavailable|Rate Limit Exceeded)\)",
+        re.IGNORECASE,
+    )
+
+    def __init__(
+        self,
+        server_folder: str,
+        steam_workshop_folder: str,
+        budget: BootBudget | None = None,
+        selection: dict | None = None,
+    ) -> None:
         """Initialize the manager with server and Steam Workshop paths.
 
         Args:
             server_folder: Root folder of the dedicated server.
             steam_workshop_folder: Root of the Steam Workshop installation
             -- (e.g., ~/.local/share/Steam/steamapps/workshop).
+            budget: Boot budget shared by the network steps (unbounded when omitted).
+            selection: Selection to use instead of the environment, with the keys
+            -- `workshop_items`, `mods` (in load order) and `collections`.
 
         """
         self.logger = setup_logger()
+        self.budget = budget or BootBudget(self.logger)
         self.server_folder = server_folder
         self.steam_workshop_folder = steam_workshop_folder
         self.steam_wk_game_folder = Path(self.steam_workshop_folder) / "content" / self.game_app_id
         self.server_workshop_folder = Path(server_folder) / "steamapps" / "workshop"
         self.server_wk_game_folder = self.server_workshop_folder / "content" / self.game_app_id
-        self.server_workshop_items: set[str] = self.get_selected_workshop_items()
-        self.active_mods: set[str] = self.get_selected_active_mods()
+        if selection is None:
+            selection = {
+                "workshop_items": self.get_selected_workshop_items(),
+                "mods": self.get_selected_active_mods(),
+                "collections": self.get_selected_collections(),
+            }
+        self.server_workshop_items: set[str] = set(selection["workshop_items"])
+        self.selected_mods: list[str] = list(selection["mods"])
+        self.active_mods: set[str] = set(self.selected_mods)
+        self.collection_ids: set[str] = set(selection["collections"])
+        self.collection_items: dict[str, set[str]] = {}
+        self.item_mods: dict[str, str] = {}
         self._apply_workshop_collections()
         self.maps = set()
+        self.mod_catalog: ModCatalog | None = None
+        self.map_index: MapCellIndex | None = None
 
     @staticmethod
     def get_selected_workshop_items() -> set[str]:
@@ -75,18 +133,18 @@ class ProjectZomboidWorkshopManager:
         return {item.strip() for item in raw.split(";") if item.strip()}
 
     @staticmethod
-    def get_selected_active_mods() -> set[str]:
+    def get_selected_active_mods() -> list[str]:
         """Read and normalize selected active mods from the `MODS` environment variable.
 
         The variable is expected to be a semicolon-separated list of mod names.
-        Empty segments and surrounding whitespace are ignored.
+        Empty segments, duplicates and surrounding whitespace are ignored.
 
         Returns:
-            A list of active mod names (strings).
+            A list of active mod names (strings), in the given order.
 
         """
         raw = os.getenv("MODS") or ""
-        return {item.strip() for item in raw.split(";") if item.strip()}
+        return list(dict.fromkeys(item.strip() for item in raw.split(";") if item.strip()))
 
     @staticmethod
     def get_selected_collections() -> set[str]:
@@ -109,24 +167,69 @@ class ProjectZomboidWorkshopManager:
         and their mod IDs (derived from the item descriptions) to the active mods.
         Items whose mod ID cannot be derived are reported in the logs so they can
         be added manually through the `MODS` environment variable.
+
+        The resolution of each collection is kept in `collection_items` and the
+        mod ID of each item in `item_mods`. A complete resolution is cached; when
+        Steam requests fail or are skipped by the boot budget, the cached
+        resolution of the same collections is used on top of whatever could be resolved.
         """
-        collection_ids = self.get_selected_collections()
-        if not collection_ids:
+        if not self.collection_ids:
             return
 
-        resolver = SteamCollectionResolver(self.logger)
-        collection_items = resolver.get_collection_items(collection_ids)
-        collection_mods = resolver.get_item_mod_ids(collection_items)
+        resolver = SteamCollectionResolver(self.logger, self.budget)
+        self.collection_items = resolver.get_collection_tree(self.collection_ids)
+        self.item_mods = resolver.get_item_mod_map(set().union(*self.collection_items.values()))
+
+        if not resolver.failed_requests:
+            self._save_collections_cache()
+        else:
+            cached = self._load_collections_cache()
+            if cached:
+                self.logger.warning("Collection resolution incomplete, using the cached resolution as well")
+                for collection_id, items in cached["collections"].items():
+                    self.collection_items[collection_id] = self.collection_items.get(collection_id, set()) | set(items)
+                self.item_mods = {**cached["item_mods"], **self.item_mods}
+
+        collection_items = set().union(*self.collection_items.values())
+        collection_mods = set(self.item_mods.values())
 
         self.logger.info(
             "Resolved %d collection(s) into %d workshop item(s) and %d mod(s).",
-            len(collection_ids),
+            len(self.collection_ids),
             len(collection_items),
             len(collection_mods),
         )
         self.server_workshop_items |= collection_items
         self.active_mods |= collection_mods
 
+    def _save_collections_cache(self) -> None:
+        """Persist a complete collection resolution for later boots."""
+        cache = {
+            "collections": {collection_id: sorted(items) for collection_id, items in self.collection_items.items()},
+            "item_mods": self.item_mods,
+        }
+        try:
+            self.collections_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            self.collections_cache_file.write_text(json.dumps(cache), encoding="utf-8")
+        except OSError as exc:
+            self.logger.warning("Could not cache the collection resolution: %s", exc)
+
+    def _load_collections_cache(self) -> dict | None:
+        """Load the cached resolution, if it was made for the same collections."""
+        try:
+            cache = json.loads(self.collections_cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(cache, dict)
+            or not isinstance(cache.get("collections"), dict)
+            or set(cache["collections"]) != self.collection_ids
+        ):
+            return None
+        cache.setdefault("item_mods", {})
+        return cache
+
     def get_downloaded_workshop_items(self) -> set[str]:
         """Inspect the Steam Workshop folder to discover already downloaded items for the Zomboid game.
 
@@ -142,23 +245,29 @@ class ProjectZomboidWorkshopManager:
         """Download selected Workshop items one-by-one using `steamcmd`.
 
         Behavior:
+            - Seeds items missing on disk from the image's pre-baked Workshop content.
+            - Verifies the items present on disk (when `WORKSHOP_VERIFY=1`) and moves the
+              damaged ones aside, so they are downloaded again. A damaged item is only
+              dropped once a fresh copy is downloaded; it is kept as is when the boot
+              budget or the circuit breaker prevents the download.
             - Skips items already present on disk.
             - Items that show an error (or nonzero return code) are collected as failed and
-              removed from `self.server_workshop_items` at the end.
+              removed from `self.server_workshop_items` at the end. Only timeouts and
+              connection or login errors count toward the circuit breaker; errors of the
+              item itself (removed, private, ...) only fail that item.
+            - The warm-up login and each download draw their timeout from the boot budget;
+              once it runs out or its circuit breaker opens, the remaining downloads are
+              skipped and those items removed as well, so the server starts with what it has.
         """
+        set_aside = self._check_local_items()
         downloaded = self.get_downloaded_workshop_items()
         succeeded: set[str] = set()
         failed: set[str] = set()
+        skipped: set[str] = set()
 
         pending = [wid for wid in self.server_workshop_items if wid not in downloaded]
         if pending:
-            # Warm steamcmd's license cache; skipping this races `+workshop_download_item`.
-            subprocess.run(
-                ["steamcmd", "+login", "anonymous", "+quit"],  # noqa: S607
-                check=False,
-                capture_output=True,
-                text=True,
-            )
+            self._warm_up_steamcmd()
 
         for wid in self.server_workshop_items.copy():
             self.logger.info("-" * 40)
@@ -168,10 +277,14 @@ class ProjectZomboidWorkshopManager:
                 succeeded.add(wid)
                 continue
 
+            step = f"download of workshop item {wid}"
+            if not self.budget.allows(step):
+                skipped.add(wid)
+                continue
+
             self.logger.info("Downloading: %s", wid)
             steam_root = str(Path(self.steam_workshop_folder).parent.parent)
             command = [
-                "steamcmd",
                 "+force_install_dir",
                 steam_root,
                 "+login",
@@ -182,12 +295,10 @@ class ProjectZomboidWorkshopManager:
                 "+quit",
             ]
 
-            installation = subprocess.run(  # noqa: S603
-                command,
-                check=False,
-                capture_output=True,
-                text=True,
-            )
+            installation = self._run_steamcmd(command, step)
+            if installation is None:
+                failed.add(wid)
+                continue
 
             saw_success = any(self.success_re.search(line) for line in (installation.stdout or "").splitlines())
             saw_error = any(self.error_re.search(line) for line in (installation.stdout or "").splitlines())
@@ -195,54 +306,235 @@ class ProjectZomboidWorkshopManager:
             if saw_error or installation.returncode != 0:
                 self.logger.error("Error reported during download of %s", wid)
                 self.logger.error("%s will be removed from the workshop list", wid)
+                if self.network_error_re.search(f"{installation.stdout or ''}\n{installation.stderr or ''}"):
+                    self.budget.record_failure(step)
                 failed.add(wid)
 
             if saw_success:
                 self.logger.info("Download succeeded: %s", wid)
+                self.budget.record_success()
                 succeeded.add(wid)
 
         self.logger.info("-" * 40)
 
-        if failed:
+        restored = self._restore_damaged_items(set_aside, succeeded)
+        failed -= restored
+        skipped -= restored
+        if failed or skipped:
             self.logger.warning(
-                "Download summary → ok:%d, failed:%d (%s)",
+                "Download summary → ok:%d, failed:%d (%s), skipped:%d (%s)",
                 len(succeeded),
                 len(failed),
                 ", ".join(sorted(failed)),
+                len(skipped),
+                ", ".join(sorted(skipped)),
             )
         else:
             self.logger.info("Download summary → ok:%d, failed:0", len(succeeded))
 
+        failed |= skipped
         self.server_workshop_items -= failed
         self.logger.info("-" * 40)
 
+    def _check_local_items(self) -> dict[str, Path]:
+        """Seed missing items from the image, then move the damaged ones aside so they are downloaded again.
+
+        Damaged items are only moved aside when the boot budget and the circuit
+        breaker allow their download; otherwise they are kept as they are, a
+        damaged item that still loads being better than a missing one.
+
+        Returns:
+            The damaged items moved aside, mapped to their folder.
+
+        """
+        self._recover_damaged_items()
+        if self.seed_dir:
+            WorkshopSeed(self.logger, self.seed_dir, self.game_app_id).seed(
+                self.steam_workshop_folder,
+                self.server_workshop_items,
+            )
+        if self.verify_mode in {"0", "false"}:
+            return {}
+
+        integrity = WorkshopIntegrity(
+            self.logger,
+            self.steam_workshop_folder,
+            self.game_app_id,
+            hash_files=self.verify_mode == "hash",
+        )
+        set_aside: dict[str, Path] = {}
+        for wid in sorted(integrity.verify(self.server_workshop_items)):
+            if not self.budget.allows(f"re-download of damaged workshop item {wid}"):
+                self.logger.warning("Keeping damaged workshop item %s, it cannot be downloaded again now", wid)
+                continue
+            aside = self.steam_wk_game_folder / f"{DAMAGED_ITEM_PREFIX}{wid}"
+            try:
+                (self.steam_wk_game_folder / wid).rename(aside)
+            except OSError as exc:
+                self.logger.error("Failed to move damaged workshop item %s aside: %s", wid, exc)
+                continue
+            self.logger.info("Damaged workshop item %s queued for download", wid)
+            set_aside[wid] = aside
+        return set_aside
+
+    def _recover_damaged_items(self) -> None:
+        """Handle the damaged items left aside by an interrupted boot.
+
+        An item that was downloaded again since is dropped, the others are put
+        back in place to be verified again.
+        """
+        if not self.steam_wk_game_folder.is_dir():
+            return
+        for aside in self.steam_wk_game_folder.glob(f"{DAMAGED_ITEM_PREFIX}*"):
+            target = self.steam_wk_game_folder / aside.name.removeprefix(DAMAGED_ITEM_PREFIX)
+            try:
+                if target.exists():
+                    shutil.rmtree(aside)
+                else:
+                    aside.rename(target)
+            except OSError as exc:
+                self.logger.error("Failed to recover damaged workshop item %s: %s", target.name, exc)
+
+    def _restore_damaged_items(self, set_aside: dict[str, Path], downloaded: set[str]) -> set[str]:
+        """Drop the damaged items downloaded again, and put the others back in place.
+
+        Args:
+            set_aside: Damaged items moved aside, mapped to their folder.
+            downloaded: Items successfully downloaded.
+
+        Returns:
+            The damaged items put back, which stay selected.
+
+        """
+        restored: set[str] = set()
+        for wid, aside in set_aside.items():
+            target = self.steam_wk_game_folder / wid
+            try:
+                if wid in downloaded:
+                    shutil.rmtree(aside)
+                    continue
+                if target.exists():
+                    shutil.rmtree(target)
+                aside.rename(target)
+            except OSError as exc:
+                self.logger.error("Failed to restore damaged workshop item %s: %s", wid, exc)
+                continue
+            self.logger.warning("Workshop item %s could not be downloaded again, keeping the damaged copy", wid)
+            restored.add(wid)
+        return restored
+
+    def scan_workshop_links(self) -> dict[str, str | None]:
+        """Scan the server workshop folder in a single pass.
+
+        Leftover temporary links of an interrupted swap are removed on the way.
+
+        Returns:
+            A mapping of each entry name to the path its symlink points to, or
+            None for entries that are not symlinks.
+
+        """
+        entries: dict[str, str | None] = {}
+        with os.scandir(self.server_wk_game_folder) as scan:
+            for entry in scan:
+                if entry.name.startswith(SYMLINK_TMP_PREFIX) and entry.is_symlink():
+                    Path(entry.path).unlink(missing_ok=True)
+                    continue
+                entries[entry.name] = str(Path(entry.path).readlink()) if entry.is_symlink() else None
+        return entries
+
+    def _warm_up_steamcmd(self) -> None:
+        """Warm steamcmd's license cache; skipping this races `+workshop_download_item`."""
+        step = "steamcmd warm-up login"
+        if not self.budget.allows(step):
+            return
+
+        warmup = self._run_steamcmd(["+login", "anonymous", "+quit"], step)
+        if warmup is not None and warmup.returncode == 0:
+            self.budget.record_success()
+        elif warmup is not None:
+            self.budget.record_failure(step)
+
+    def _run_steamcmd(self, arguments: list[str], step: str) -> subprocess.CompletedProcess | None:
+        """Run steamcmd within the boot budget.
+
+        Args:
+            arguments: steamcmd arguments (commands prefixed with `+`).
+            step: Description of the step, used in the logs and the budget.
+
+        The `steamcmd` wrapper script runs the real binary as a child, so it
+        is started in its own process group and the whole group is killed on
+        timeout: nothing keeps writing to the Workshop folder afterwards.
+
+        Returns:
+            The completed process, or None if it timed out (recorded as a failure).
+
+        """
+        timeout = self.budget.timeout()
+        command = ["steamcmd", *arguments]
+        process = subprocess.Popen(  # noqa: S603
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
+        )
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(process.pid, signal.SIGKILL)
+            process.communicate()
+            self.logger.error("%s timed out after %ds", step, timeout)
+            self.budget.record_failure(step)
+            return None
+        return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
     def update_workshop_items_links(self) -> None:
         """Synchronize server workshop symlinks with the current selection.
 
         For each selected Workshop ID in `self.server_workshop_items`, ensure a symlink
         exists in `self.server_workshop_folder` pointing to the corresponding folder, that way
         it is easier to manage the mods from the server side.
+
+        The folder is scanned once to compute the links to add, change and remove;
+        only those are touched. Links are swapped atomically, so an interrupted sync
+        never leaves a selected item missing.
         """
-        desired: set[str] = set(self.server_workshop_items)
+        desired = {wid: str(self.steam_wk_game_folder / wid) for wid in self.server_workshop_items}
         self.server_wk_game_folder.mkdir(parents=True, exist_ok=True)
+        current = self.scan_workshop_links()
 
-        # Discover existing symlinks in the server workshop folder
-        current_links: set[str] = {p.name for p in self.server_wk_game_folder.iterdir() if p.is_symlink()}
+        to_remove = sorted(name for name, link in current.items() if link is not None and name not in desired)
+        to_add = {wid for wid in desired if wid not in current}
+        to_change = {wid for wid in desired if wid in current and current[wid] != desired[wid]}
 
-        for name in sorted(current_links - desired):
+        removed = 0
+        for name in to_remove:
             link_path = self.server_wk_game_folder / name
             try:
                 link_path.unlink()
+                removed += 1
                 self.logger.info("Removed stale workshop link: %s", name)
             except OSError as exc:
                 self.logger.error("Failed to remove link %s: %s", name, exc)
 
-        linked, errors = 0, 0
-        for wid in sorted(desired):
-            source_dir = self.steam_wk_game_folder / wid
+        added = changed = errors = 0
+        for wid in sorted(to_add | to_change):
+            source_dir = Path(desired[wid])
             target_dir = self.server_wk_game_folder / wid
-            if generate_symlink(source_dir, target_dir):
-                linked += 1
+            if wid in current and current[wid] is None:
+                # A real folder or file is in the way, it has to be removed first
+                linked = generate_symlink(source_dir, target_dir)
+            else:
+                try:
+                    swap_symlink(source_dir, target_dir)
+                    linked = True
+                except OSError:
+                    linked = False
+
+            if linked:
+                added += wid in to_add
+                changed += wid in to_change
                 self.logger.info("Linked workshop item: %s", wid)
             else:
                 errors += 1
@@ -267,7 +559,14 @@ class ProjectZomboidWorkshopManager:
             )
 
         self.logger.info("-" * 40)
-        self.logger.info("Linking summary → linked:%d, errors:%d", linked, errors)
+        self.logger.info(
+            "Linking summary → added:%d, changed:%d, removed:%d, unchanged:%d, errors:%d",
+            added,
+            changed,
+            removed,
+            len(desired) - len(to_add) - len(to_change),
+            errors,
+        )
         self.logger.info("-" * 40)
 
     def is_mod_active(self, mod_path: Path) -> bool:
@@ -315,6 +614,7 @@ class ProjectZomboidWorkshopManager:
         Iterates through each selected workshop item, checks active mods within them,
         and searches for map directories under 'media/maps/'. For each map found,
         records the map name and, if present, the path to the spawnpoints.lua file.
+        The cells of each map are added to a fresh `map_index` on the way.
 
         Returns:
             A list of dictionaries, each containing:
@@ -326,6 +626,7 @@ class ProjectZomboidWorkshopManager:
         self.logger.info("-" * 40)
 
         maps = []
+        self.map_index = MapCellIndex(self.logger)
 
         # Builds the list of possible workshop paths to search for active mods
         wk_path_to_mods = [self.server_wk_game_folder / wid / "mods" for wid in self.server_workshop_items]
@@ -359,6 +660,7 @@ class ProjectZomboidWorkshopManager:
                     map_found["file"] = f"media/maps/{map_path.name}/spawnpoints.lua"
 
                 self.logger.info(message, map_path.name)
+                self.logger.info("    %d cell(s)", self.map_index.add_map(map_path.name, map_path))
                 maps.append(map_found)
                 maps_found.append(map_path.name)
 
@@ -441,34 +743,103 @@ class ProjectZomboidWorkshopManager:
             len(new_rows),
         )
 
-    def process_workshop_items(self) -> None:
-        """Process the entire workshop items routine: download and link."""
+    def prepare_workshop_items(self) -> None:
+        """Promote the staged updates, then download, link and catalog the selected workshop items."""
+        WorkshopStaging(self.logger, self.steam_workshop_folder, self.game_app_id).promote(self.server_workshop_items)
         self.download_workshop_items()
         self.update_workshop_items_links()
 
+        self.mod_catalog = ModCatalog(self.logger).scan(
+            [self.server_wk_game_folder / wid for wid in sorted(self.server_workshop_items)],
+        )
+
+    def process_workshop_maps(self) -> None:
+        """Discover the maps of the active mods, report overlaps and generate the spawnregions file."""
         maps_info = self.discover_workshop_maps()
         self.maps = {rec["map"] for rec in maps_info if "map" in rec}
 
+        if self.maps and self.map_index:
+            conflicts = self.map_index.report_overlaps()
+            if conflicts:
+                self.logger.warning("%d map overlap(s) without a declared priority, check the MAP order", conflicts)
+            self.logger.info("Suggested MAP order: %s", self.get_maps_string())
+
         self.generate_spawnpoints_file(maps_info)
 
+    def process_workshop_items(self) -> None:
+        """Process the entire workshop items routine: download, link, catalog and maps."""
+        self.prepare_workshop_items()
+        self.process_workshop_maps()
+
+    def for_server(
+        self,
+        server_name: str,
+        workshop_items: set[str],
+        collections: set[str],
+        mods: list[str],
+    ) -> "ProjectZomboidWorkshopManager":
+        """Return a view of this manager restricted to the selection of one server.
+
+        The view shares the downloads, links, collection resolution and mod
+        catalog of this manager, so it must have been prepared with a selection
+        covering every server. Items that failed to download are left out.
+
+        Args:
+            server_name: Name of the server the view generates files for.
+            workshop_items: Workshop items selected for the server.
+            collections: Workshop collections selected for the server.
+            mods: Mods selected for the server, in load order.
+
+        Returns:
+            A new manager instance for that server.
+
+        """
+        view = copy.copy(self)
+        items = set(workshop_items)
+        derived_mods: set[str] = set()
+        for collection_id in collections:
+            collection_items = self.collection_items.get(collection_id, set())
+            items |= collection_items
+            derived_mods |= {self.item_mods[item] for item in collection_items if item in self.item_mods}
+
+        view.server_name = server_name
+        view.server_workshop_items = items & self.server_workshop_items
+        view.selected_mods = list(mods)
+        view.active_mods = set(mods) | derived_mods
+        view.collection_ids = set(collections)
+        view.maps = set()
+        view.map_index = None
+        return view
+
     def get_mods_string(self) -> str:
         """Get the active mods as a semicolon-separated string.
 
         Preserves the order given in the `MODS` environment variable (which
         defines the mod load order) and appends the mods derived from Workshop
-        collections in alphabetical order.
+        collections in alphabetical order. Once the mod catalog is built (by
+        `prepare_workshop_items`), mods are then moved as needed so each one
+        loads after the mods its `mod.info` requires.
         """
-        selected = [mod.strip() for mod in (os.getenv("MODS") or "").split(";") if mod.strip()]
-        derived = sorted(self.active_mods - set(selected))
-        return ";".join(selected + derived)
+        derived = sorted(self.active_mods - set(self.selected_mods))
+        mods = self.selected_mods + derived
+
+        if self.mod_catalog is not None:
+            mods = self.mod_catalog.resolve_load_order(mods)
+        return ";".join(mods)
 
     def get_maps_string(self) -> str:
         """Get the discovered maps as a semicolon-separated string.
 
-        It always starts with "Muldraugh, KY" as the default map. If no maps
-        were discovered, it returns just the default map.
+        It always ends with "Muldraugh, KY" as the default map. If no maps
+        were discovered, it returns just the default map. Maps are sorted
+        alphabetically, then moved as needed so each one comes before the maps
+        its `map.info` declares it is placed over (the first map wins the cells
+        they share).
         """
         last_map = "Muldraugh, KY"
-        maps_str = ";".join(sorted(self.maps))
+        maps = sorted(self.maps)
+        if self.map_index:
+            maps = self.map_index.suggest_order(maps)
+        maps_str = ";".join(maps)
 
         return f"{maps_str};{last_map}" if maps_str else last_map
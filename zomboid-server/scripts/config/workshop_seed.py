@@ -0,0 +1,242 @@
+#!/bin/python3
+"""Workshop content pre-baked into the image at build time.
+
+At `docker build` time, the items of `PREBAKE_WORKSHOP_ITEMS` and
+`PREBAKE_COLLECTIONS` are resolved and downloaded with the same code paths as
+at runtime, into a read-only seed directory (`WORKSHOP_SEED_DIR`) laid out like
+a Steam installation. At runtime the workshop manager seeds the Workshop volume
+from it before downloading, so only the items missing from the seed are
+fetched from Steam.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import stat
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from utils import setup_logger
+
+if TYPE_CHECKING:
+    import logging
+
+# Tokens of a Valve KeyValues (.acf/.vdf) file: quoted strings and braces
+VDF_TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])')
+
+
+def parse_vdf(content: str) -> dict:
+    """Parse a Valve KeyValues document (e.g. `appworkshop_108600.acf`).
+
+    Args:
+        content: Content of the document.
+
+    Returns:
+        A nested dictionary; leaves are strings.
+
+    """
+    root: dict = {}
+    stack = [root]
+    key = None
+    for match in VDF_TOKEN_RE.finditer(content):
+        text, brace = match.groups()
+        if brace == "{":
+            child: dict = {}
+            stack[-1][key] = child
+            stack.append(child)
+            key = None
+        elif brace == "}":
+            if len(stack) > 1:
+                stack.pop()
+        elif key is None:
+            key = text
+        else:
+            stack[-1][key] = text
+            key = None
+    return root
+
+
+def dump_vdf(data: dict, indent: int = 0) -> str:
+    """Serialize a nested dictionary as a Valve KeyValues document."""
+    tabs = "\t" * indent
+    lines = []
+    for key, value in data.items():
+        if isinstance(value, dict):
+            lines += [f'{tabs}"{key}"', f"{tabs}{{", dump_vdf(value, indent + 1) + f"{tabs}}}"]
+        else:
+            lines.append(f'{tabs}"{key}"\t\t"{value}"')
+    return "".join(f"{line}\n" for line in lines)
+
+
+def _make_writable(folder: Path) -> None:
+    """Give the owner write access to a copied folder, dropped from the read-only seed."""
+    for root, _, names in os.walk(folder):
+        for path in [Path(root), *(Path(root) / name for name in names)]:
+            if not path.is_symlink():
+                path.chmod(path.stat().st_mode | stat.S_IWUSR)
+
+
+def merge_manifest_entries(logger: logging.Logger, source_file: Path, target_file: Path, items: set[str]) -> None:
+    """Copy the entries of some Workshop items from one manifest to another.
+
+    The `WorkshopItemsInstalled` and `WorkshopItemDetails` entries of `items`
+    are taken from `source_file`; the other entries of `target_file` are kept.
+    A missing target takes the app-level fields of the source. The target is
+    replaced atomically.
+
+    Args:
+        logger: Logger used to report failures.
+        source_file: Manifest (`appworkshop_<app>.acf`) to take the entries from.
+        target_file: Manifest to update.
+        items: Workshop IDs whose entries are copied.
+
+    """
+    if not items or not source_file.is_file():
+        return
+
+    try:
+        source_state = parse_vdf(source_file.read_text(encoding="utf-8")).get("AppWorkshop", {})
+        current = parse_vdf(target_file.read_text(encoding="utf-8")) if target_file.is_file() else {}
+    except OSError as exc:
+        logger.error("Failed to read the workshop manifests: %s", exc)
+        return
+
+    header = {key: value for key, value in source_state.items() if isinstance(value, str)}
+    state = current.setdefault("AppWorkshop", header)
+    for section in ("WorkshopItemsInstalled", "WorkshopItemDetails"):
+        entries = state.setdefault(section, {})
+        for wid in items:
+            if wid in source_state.get(section, {}):
+                entries[wid] = source_state[section][wid]
+
+    temporary = target_file.with_name(f".{target_file.name}.tmp")
+    try:
+        temporary.write_text(dump_vdf(current), encoding="utf-8")
+        temporary.replace(target_file)
+    except OSError as exc:
+        logger.error("Failed to update the workshop manifest %s: %s", target_file, exc)
+
+
+class WorkshopSeed:
+    """Seed a Steam Workshop folder from the content pre-baked into the image.
+
+    Attributes:
+        - logger: Logger used to report seeding progress.
+        - seed_workshop_folder: Workshop folder of the seed (`<seed>/steamapps/workshop`).
+        - game_app_id: Steam App ID of the game the items belong to.
+
+    """
+
+    def __init__(self, logger: logging.Logger, seed_dir: str, game_app_id: str) -> None:
+        """Initialize the seed.
+
+        Args:
+            logger: Logger used to report seeding progress.
+            seed_dir: Root of the seed directory (a Steam installation root).
+            game_app_id: Steam App ID of the game the items belong to.
+
+        """
+        self.logger = logger
+        self.game_app_id = game_app_id
+        self.seed_workshop_folder = Path(seed_dir) / "steamapps" / "workshop"
+
+    @property
+    def manifest_name(self) -> str:
+        """File name of the Workshop manifest of the game."""
+        return f"appworkshop_{self.game_app_id}.acf"
+
+    def get_seeded_items(self) -> set[str]:
+        """Return the Workshop IDs available in the seed."""
+        content = self.seed_workshop_folder / "content" / self.game_app_id
+        if not content.is_dir():
+            return set()
+        return {p.name for p in content.iterdir() if p.name.isdigit() and p.is_dir()}
+
+    def seed(self, steam_workshop_folder: str, workshop_items: set[str]) -> set[str]:
+        """Copy the seeded items missing from a Workshop folder into it.
+
+        Files are copied: the seed is in the image and the Workshop folder is a
+        volume, so they never share a filesystem and hardlinks are not an
+        option. The copies are made writable, so later steamcmd updates can
+        overwrite them. Each item is built under a temporary name and renamed
+        into place, so an interrupted seed never leaves a half-populated item
+        behind. The manifest entries of the seeded items are merged into the
+        Workshop folder manifest.
+
+        Args:
+            steam_workshop_folder: Workshop folder to seed.
+            workshop_items: Workshop IDs selected for the server.
+
+        Returns:
+            The Workshop IDs that were seeded.
+
+        """
+        target_content = Path(steam_workshop_folder) / "content" / self.game_app_id
+        seed_content = self.seed_workshop_folder / "content" / self.game_app_id
+        present = {p.name for p in target_content.iterdir()} if target_content.is_dir() else set()
+        to_seed = sorted((self.get_seeded_items() & workshop_items) - present)
+        if not to_seed:
+            return set()
+
+        target_content.mkdir(parents=True, exist_ok=True)
+        seeded: set[str] = set()
+        for wid in to_seed:
+            temporary = target_content / f".seed-{wid}"
+            try:
+                shutil.rmtree(temporary, ignore_errors=True)
+                # Copied, not hardlinked: the seed is in the image and the cache on a volume
+                shutil.copytree(seed_content / wid, temporary, symlinks=True, copy_function=shutil.copyfile)
+                _make_writable(temporary)
+                temporary.replace(target_content / wid)
+            except OSError as exc:
+                self.logger.error("Failed to seed workshop item %s from the image: %s", wid, exc)
+                shutil.rmtree(temporary, ignore_errors=True)
+                continue
+            seeded.add(wid)
+
+        merge_manifest_entries(
+            self.logger,
+            self.seed_workshop_folder / self.manifest_name,
+            Path(steam_workshop_folder) / self.manifest_name,
+            seeded,
+        )
+        self.logger.info("Seeded %d workshop item(s) from the image: %s", len(seeded), ", ".join(sorted(seeded)))
+        return seeded
+
+
+def main() -> None:
+    """Download PREBAKE_WORKSHOP_ITEMS and PREBAKE_COLLECTIONS into WORKSHOP_SEED_DIR."""
+    # Imported here so the runtime import of this module stays lightweight
+    from workshop_manager import ProjectZomboidWorkshopManager  # noqa: PLC0415
+
+    logger = setup_logger()
+    seed_dir = os.getenv("WORKSHOP_SEED_DIR", "/workshop-seed")
+    selection = {
+        "workshop_items": {item.strip() for item in os.getenv("PREBAKE_WORKSHOP_ITEMS", "").split(";") if item.strip()},
+        "collections": {item.strip() for item in os.getenv("PREBAKE_COLLECTIONS", "").split(";") if item.strip()},
+        "mods": [],
+    }
+    if not selection["workshop_items"] and not selection["collections"]:
+        logger.info("No workshop items to pre-bake")
+        return
+
+    wk_manager = ProjectZomboidWorkshopManager(
+        os.getenv("SERVER_DIR", "/pzomboid-server"),
+        f"{seed_dir}/steamapps/workshop",
+        selection=selection,
+    )
+    selected = set(wk_manager.server_workshop_items)
+    wk_manager.download_workshop_items()
+
+    failed = selected - wk_manager.server_workshop_items
+    if failed:
+        logger.error("Failed to pre-bake workshop item(s): %s", ", ".join(sorted(failed)))
+        sys.exit(1)
+    logger.info("Pre-baked %d workshop item(s) into %s", len(selected), seed_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/bin/python3
+"""Workshop updates staged while the server runs, promoted at the next restart.
+
+Run while the server is live (e.g. from a scheduled job ahead of a restart),
+this script compares the `time_updated` of every selected Workshop item on
+Steam with the one recorded in the Workshop manifest, and downloads the
+outdated or missing items into a shadow Steam installation
+(`<workshop folder>/staging`). The running server keeps using the live
+content untouched.
+
+At the next boot, the workshop manager promotes the staged items before
+downloading anything: each one is renamed into the live Workshop folder (same
+volume, so no copy) and its manifest entries are swapped in atomically. The
+update then costs a regular restart instead of the download time.
+"""
+
+from __future__ import annotations
+
+import shutil
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from utils import load_custom_variables, setup_logger
+from workshop_seed import merge_manifest_entries, parse_vdf
+
+if TYPE_CHECKING:
+    import logging
+
+STAGING_DIR_NAME = "staging"
+
+
+class WorkshopStaging:
+    """Shadow Steam installation holding Workshop updates until the next restart.
+
+    Attributes:
+        - logger: Logger used to report staging progress.
+        - steam_workshop_folder: Live Workshop folder the server uses.
+        - staging_workshop_folder: Workshop folder of the shadow installation.
+        - game_app_id: Steam App ID of the game the items belong to.
+
+    """
+
+    def __init__(self, logger: logging.Logger, steam_workshop_folder: str, game_app_id: str) -> None:
+        """Initialize the staging area of a live Workshop folder."""
+        self.logger = logger
+        self.game_app_id = game_app_id
+        self.steam_workshop_folder = Path(steam_workshop_folder)
+        self.staging_root = self.steam_workshop_folder / STAGING_DIR_NAME
+        self.staging_workshop_folder = self.staging_root / "steamapps" / "workshop"
+
+    @property
+    def manifest_name(self) -> str:
+        """File name of the Workshop manifest of the game."""
+        return f"appworkshop_{self.game_app_id}.acf"
+
+    def get_installed_times(self, workshop_folder: Path) -> dict[str, int]:
+        """Read the `timeupdated` of each item installed in a Workshop folder from its manifest."""
+        try:
+            manifest = parse_vdf((workshop_folder / self.manifest_name).read_text(encoding="utf-8"))
+        except OSError:
+            return {}
+
+        installed = manifest.get("AppWorkshop", {}).get("WorkshopItemsInstalled", {})
+        return {
+            wid: int(entry.get("timeupdated") or 0)
+            for wid, entry in installed.items()
+            if isinstance(entry, dict) and str(entry.get("timeupdated") or "0").isdigit()
+        }
+
+    def get_staged_items(self) -> set[str]:
+        """Return the Workshop IDs whose download to the staging area completed."""
+        content = self.staging_workshop_folder / "content" / self.game_app_id
+        if not content.is_dir():
+            return set()
+        return {p.name for p in content.iterdir() if p.name.isdigit() and p.is_dir()}
+
+    def get_outdated_items(self, workshop_items: set[str], remote_times: dict[str, int]) -> set[str]:
+        """Select the items updated on Steam since they were installed or staged.
+
+        Items missing from the live Workshop folder are included, so the next
+        boot does not have to download them either.
+
+        Args:
+            workshop_items: Workshop IDs selected for the server.
+            remote_times: `time_updated` of each item on Steam.
+
+        Returns:
+            The Workshop IDs to stage.
+
+        """
+        live_content = self.steam_workshop_folder / "content" / self.game_app_id
+        installed = self.get_installed_times(self.steam_workshop_folder)
+        staged = self.get_installed_times(self.staging_workshop_folder)
+        staged_items = self.get_staged_items()
+
+        outdated = set()
+        for wid in workshop_items & set(remote_times):
+            local_time = staged.get(wid, 0) if wid in staged_items else installed.get(wid, 0)
+            if remote_times[wid] > local_time or not ((live_content / wid).is_dir() or wid in staged_items):
+                outdated.add(wid)
+        return outdated
+
+    def discard(self, workshop_items: set[str]) -> None:
+        """Remove staged copies of items, so they are downloaded again."""
+        content = self.staging_workshop_folder / "content" / self.game_app_id
+        for wid in workshop_items:
+            shutil.rmtree(content / wid, ignore_errors=True)
+
+    def promote(self, workshop_items: set[str]) -> set[str]:
+        """Swap the staged items into the live Workshop folder, then clear the staging area.
+
+        Each staged item replaces its live folder with two renames on the same
+        volume; the previous content is deleted afterwards. The manifest
+        entries of the promoted items are merged into the live manifest
+        atomically. Staged items that are no longer selected are discarded.
+
+        Args:
+            workshop_items: Workshop IDs selected for the server.
+
+        Returns:
+            The Workshop IDs that were promoted.
+
+        """
+        if not self.staging_root.is_dir():
+            return set()
+
+        staged_content = self.staging_workshop_folder / "content" / self.game_app_id
+        live_content = self.steam_workshop_folder / "content" / self.game_app_id
+        live_content.mkdir(parents=True, exist_ok=True)
+
+        promoted: set[str] = set()
+        for wid in sorted(self.get_staged_items() & workshop_items):
+            replaced = live_content / f".replaced-{wid}"
+            try:
+                shutil.rmtree(replaced, ignore_errors=True)
+                if (live_content / wid).exists():
+                    (live_content / wid).replace(replaced)
+                (staged_content / wid).replace(live_content / wid)
+            except OSError as exc:
+                self.logger.error("Failed to promote the staged update of workshop item %s: %s", wid, exc)
+                continue
+            shutil.rmtree(replaced, ignore_errors=True)
+            promoted.add(wid)
+
+        merge_manifest_entries(
+            self.logger,
+            self.staging_workshop_folder / self.manifest_name,
+            self.steam_workshop_folder / self.manifest_name,
+            promoted,
+        )
+        shutil.rmtree(self.staging_root, ignore_errors=True)
+
+        if promoted:
+            self.logger.info("Promoted %d staged workshop update(s): %s", len(promoted), ", ".join(sorted(promoted)))
+        return promoted
+
+
+def main() -> None:
+    """Stage the updates of the selected Workshop items while the server runs."""
+    # Imported here so the runtime import of this module stays lightweight
+    from boot_budget import BootBudget  # noqa: PLC0415
+    from collection_resolver import SteamCollectionResolver  # noqa: PLC0415
+    from workshop_manager import ProjectZomboidWorkshopManager  # noqa: PLC0415
+
+    logger = setup_logger()
+    variables = load_custom_variables()
+    budget = BootBudget.from_env(variables, logger)
+    server_folder = variables.get("SERVER_DIR", "/pzomboid-server")
+    wk_manager = ProjectZomboidWorkshopManager(server_folder, variables.get("STEAM_WORKSHOP_DEFAULT_DIR", ""), budget)
+
+    staging = WorkshopStaging(logger, wk_manager.steam_workshop_folder, wk_manager.game_app_id)
+    remote_times = SteamCollectionResolver(logger, budget).get_item_update_times(wk_manager.server_workshop_items)
+    outdated = staging.get_outdated_items(wk_manager.server_workshop_items, remote_times)
+    if not outdated:
+        logger.info("All %d workshop item(s) are up to date", len(wk_manager.server_workshop_items))
+        return
+
+    logger.info("Staging %d workshop update(s): %s", len(outdated), ", ".join(sorted(outdated)))
+    staging.discard(outdated)
+    stager = ProjectZomboidWorkshopManager(
+        server_folder,
+        str(staging.staging_workshop_folder),
+        budget,
+        selection={"workshop_items": outdated, "mods": [], "collections": set()},
+    )
+    # Staged content must come from Steam, not from the image seed
+    stager.seed_dir = ""
+    stager.download_workshop_items()
+
+    failed = outdated - stager.server_workshop_items
+    if failed:
+        logger.error("Failed to stage workshop item(s): %s", ", ".join(sorted(failed)))
+        sys.exit(1)
+    logger.info("Staged %d workshop update(s), they will be applied at the next restart", len(outdated))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,15 @@
 # This script serves as the main entrypoint for the Docker container.
 # It loads server environment variables for Docker-based customization,
 # replaces configuration files with environment-specific values,
-# and starts the Project Zomboid server using the final configuration.
+# and starts the Project Zomboid server using the final configuration,
+# optionally under a supervisor (SUPERVISOR=1).
 
 DIR=$(cd -- "$(dirname -- "${BASH_SOURCE[0]}")" &>/dev/null && pwd)
 BASE_VARIABLES_SCRIPT="${DIR}/server-base-variables.sh"
 SERVER_INIT_SCRIPT="${DIR}/init-server.sh"
 SERVER_CONFIG_UPDATE_SCRIPT="${DIR}/config/main.py"
+SUPERVISOR_SCRIPT="${DIR}/config/supervisor.py"
+LOG_ROTATION_SCRIPT="${DIR}/config/log_rotation.py"
 
 if [[ $# -gt 0 ]]; then
 	exec "$@"
@@ -41,7 +44,22 @@ if [[ ! -x "${SERVER_INIT_SCRIPT}" ]]; then
 	exit 1
 fi
 
+# Archive the logs of the previous run, then keep rotating them in the background.
+# The supervisor runs the worker itself and stops it with the server.
+if [[ "${LOG_ROTATION,,}" =~ ^(1|true)$ ]]; then
+	python3 "${LOG_ROTATION_SCRIPT}"
+	if [[ ! "${SUPERVISOR,,}" =~ ^(1|true)$ ]]; then
+		python3 "${LOG_ROTATION_SCRIPT}" --watch &
+	fi
+fi
+
 echo "Server configuration has been updated. Continuing in 5 seconds..."
 sleep 5
 
+# Keep a supervisor as PID 1 to save on stop and restart the server on crashes
+if [[ "${SUPERVISOR,,}" =~ ^(1|true)$ ]]; then
+	cd "$(dirname "${SUPERVISOR_SCRIPT}")" || echo "Error: Failed to change directory"
+	exec python3 "$(basename "${SUPERVISOR_SCRIPT}")" "${SERVER_INIT_SCRIPT}"
+fi
+
 exec "${SERVER_INIT_SCRIPT}"
@@ -25,6 +25,14 @@ ZOMBOID_SERVER_APP_ID="${ZOMBOID_SERVER_APP_ID:-380870}"
 SERVER_PRESET="${SERVER_PRESET:-}"
 FORCE_PRESET="${FORCE_PRESET:-0}" # 0 = False, 1 = True
 DEFAULTS_DIR="${DEFAULTS_DIR:-/defaults}"
+SERVERS_SPEC_FILE="${SERVERS_SPEC_FILE:-}" # JSON/TOML spec describing several servers
+WORKSHOP_SEED_DIR="${WORKSHOP_SEED_DIR:-/workshop-seed}" # Workshop content pre-baked at build time
+WORKSHOP_VERIFY="${WORKSHOP_VERIFY:-1}" # 0 = off, 1 = manifest checks, hash = also content hashes
+
+# Boot deadline (seconds, 0 = none) and consecutive network failures before
+# the remaining network steps (Steam API, steamcmd) are skipped (0 = never)
+BOOT_DEADLINE_SECONDS="${BOOT_DEADLINE_SECONDS:-0}"
+NETWORK_FAILURE_THRESHOLD="${NETWORK_FAILURE_THRESHOLD:-3}"
 
 # Java and memory settings
 SERVER_MEMORY="${SERVER_MEMORY:-2048m}"
@@ -49,6 +57,22 @@ MODFOLDERS="${MODFOLDERS:-}"
 RCON_PORT="${RCON_PORT:-27015}"
 RCON_PASSWORD="${RCON_PASSWORD:-admin}"
 
+# Supervisor: save and quit over RCON on stop (seconds before killing the
+# server) and restart the server on crashes with an exponential backoff
+SUPERVISOR="${SUPERVISOR:-0}" # 0 = False, 1 = True
+SUPERVISOR_STOP_TIMEOUT="${SUPERVISOR_STOP_TIMEOUT:-60}"
+SUPERVISOR_RESTART_DELAY="${SUPERVISOR_RESTART_DELAY:-5}"
+SUPERVISOR_MAX_RESTART_DELAY="${SUPERVISOR_MAX_RESTART_DELAY:-300}"
+
+# Log rotation: compress released logs (gzip or zstd) every interval (seconds)
+# and keep archives for a number of days and up to a total size (0 = no limit)
+LOG_ROTATION="${LOG_ROTATION:-0}" # 0 = False, 1 = True
+LOG_COMPRESSION="${LOG_COMPRESSION:-gzip}"
+LOG_ROTATE_INTERVAL="${LOG_ROTATE_INTERVAL:-3600}"
+LOG_ROTATE_IDLE_SECONDS="${LOG_ROTATE_IDLE_SECONDS:-600}"
+LOG_RETENTION_DAYS="${LOG_RETENTION_DAYS:-14}"
+LOG_RETENTION_MB="${LOG_RETENTION_MB:-512}"
+
 # Expose the Steam buildid baked into the image
 if [[ -z "${PZ_BUILD_ID:-}" && -f /PZ_BUILD_ID ]]; then
 	PZ_BUILD_ID="$(cat /PZ_BUILD_ID 2>/dev/null || echo unknown)"